@@ -1,17 +1,27 @@
 # card_maker_pro_plus.py
-from flask import Flask, request, render_template_string, send_file, Response
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from flask import Flask, g, request, render_template_string, send_from_directory, stream_with_context, Response, jsonify
+from PIL import Image, ImageCms, ImageDraw, ImageFont, ImageFilter, ImageMath
+from array import array
 import qrcode
-import io, os, uuid, tempfile, time, base64
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from werkzeug.exceptions import NotFound
+import io, os, random, re, uuid, tempfile, time, base64, functools, hashlib, hmac, itertools, json, math, mmap, sqlite3, struct, threading, tracemalloc, weakref, zlib
 
 app = Flask(__name__)
 
 # ====== Temp result dir ======
 RESULT_DIR = os.path.join(tempfile.gettempdir(), "card_maker_results")
 os.makedirs(RESULT_DIR, exist_ok=True)
+RESULT_MAX_AGE_HOURS = 12
+# Di belakang nginx: prefix location internal yang menunjuk ke RESULT_DIR (mis. "/_results/"); file lalu dikirim
+# nginx lewat X-Accel-Redirect. Kosong = dikirim dari proses ini (wsgi.file_wrapper -> sendfile di gunicorn).
+RESULT_ACCEL_REDIRECT = os.environ.get("CARD_ACCEL_REDIRECT", "")
 
 
-def cleanup_old(max_age_hours=12):
+def cleanup_old(max_age_hours=RESULT_MAX_AGE_HOURS):
     cutoff = time.time() - max_age_hours * 3600
     for name in os.listdir(RESULT_DIR):
         path = os.path.join(RESULT_DIR, name)
@@ -22,40 +32,228 @@ def cleanup_old(max_age_hours=12):
             pass
 
 
-def save_result(data: bytes, ext: str):
+def result_path(ext: str):
     cleanup_old()
     token = uuid.uuid4().hex
-    path = os.path.join(RESULT_DIR, f"{token}.{ext}")
-    with open(path, "wb") as f:
-        f.write(data)
-    return f"/result/{token}.{ext}"
+    return os.path.join(RESULT_DIR, f"{token}.{ext}"), f"/result/{token}.{ext}"
+
+
+@contextmanager
+def result_files(*exts):
+    """
+    File hasil baru yang langsung ditulis encoder (tanpa salinan bytes di memori).
+    Yield [(file object, url)] sesuai urutan `exts`; bila gagal, file setengah jadi dihapus.
+    """
+    paths = [result_path(ext) for ext in exts]
+    with ExitStack() as stack:
+        try:
+            yield [(stack.enter_context(open(path, "wb")), url) for path, url in paths]
+        except BaseException:
+            stack.close()
+            for path, _ in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
 
 
 @app.route("/result/<fname>")
 def serve_result(fname):
-    path = os.path.join(RESULT_DIR, fname)
-    if os.path.exists(path):
-        mime = "image/png" if fname.lower().endswith(".png") else "application/pdf"
-        return send_file(path, mimetype=mime, as_attachment=False, download_name=fname)
-    return "Not Found", 404
+    """
+    File hasil (nama acak, isi tidak pernah berubah). send_from_directory menangani If-None-Match /
+    If-Modified-Since (304) dan Range (206); isinya dikirim lewat wsgi.file_wrapper (sendfile di gunicorn),
+    atau oleh nginx lewat X-Accel-Redirect bila CARD_ACCEL_REDIRECT diset.
+    """
+    mime = "image/png" if fname.lower().endswith(".png") else "application/pdf"
+    try:
+        if RESULT_ACCEL_REDIRECT:
+            if not os.path.isfile(os.path.join(RESULT_DIR, os.path.basename(fname))):
+                raise NotFound()
+            resp = Response(mimetype=mime, headers={"X-Accel-Redirect": RESULT_ACCEL_REDIRECT + os.path.basename(fname)})
+        else:
+            resp = send_from_directory(RESULT_DIR, fname, mimetype=mime, as_attachment=False, download_name=fname,
+                                       conditional=True, max_age=RESULT_MAX_AGE_HOURS * 3600)
+    except NotFound:
+        return "Not Found", 404
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    resp.cache_control.immutable = True
+    return resp
+
+
+# ====== Render limits (large format) ======
+# Kartu di atas LARGE_FORMAT_PIXELS (poster/banner) dirender & di-encode per strip horizontal
+# dengan budget memori RENDER_MEMORY_MB; di atas MAX_CARD_PIXELS ditolak.
+MAX_CARD_PIXELS = int(os.environ.get("CARD_MAX_PIXELS", "64000000"))
+LARGE_FORMAT_PIXELS = int(os.environ.get("CARD_LARGE_FORMAT_PIXELS", "6000000"))
+RENDER_MEMORY_MB = int(os.environ.get("CARD_RENDER_MEMORY_MB", "256"))
+STRIP_BUFFERS = 6  # perkiraan jumlah buffer RGBA selebar kartu yang hidup per strip
+# Glow besar (aurora) di-blur pada resolusi 1/2^n selama radius yang tersisa >= nilai ini; 0 = selalu resolusi penuh.
+BLUR_MIN_RADIUS = int(os.environ.get("CARD_BLUR_MIN_RADIUS", "8"))
+
+# ====== Print color (CMYK PDF) ======
+# Transform ICC dibangun sekali per (profil input, profil output, intent) lalu dipakai ulang semua request.
+# Tanpa CARD_CMYK_PROFILE, PDF CMYK memakai konversi naif Pillow (tanpa manajemen warna).
+RGB_PROFILE = os.environ.get("CARD_RGB_PROFILE", "")    # kosong = sRGB bawaan
+CMYK_PROFILE = os.environ.get("CARD_CMYK_PROFILE", "")  # mis. ISOcoated_v2_eci.icc dari percetakan
+CMYK_INTENT = os.environ.get("CARD_CMYK_INTENT", "perceptual")
+RENDER_INTENTS = {
+    "perceptual": ImageCms.Intent.PERCEPTUAL,
+    "relative": ImageCms.Intent.RELATIVE_COLORIMETRIC,
+    "saturation": ImageCms.Intent.SATURATION,
+    "absolute": ImageCms.Intent.ABSOLUTE_COLORIMETRIC,
+}
+
+# ====== Render thread pool ======
+# Layer kartu (background, QR, logo, teks) dibangun bersamaan di pool bersama; filter/resize/encode PIL
+# melepas GIL. Default aktif untuk kartu >= PARALLEL_MIN_PIXELS, bisa dipaksa lewat payload["parallel"].
+RENDER_THREADS = int(os.environ.get("CARD_RENDER_THREADS", str(min(4, os.cpu_count() or 1))))
+PARALLEL_MIN_PIXELS = int(os.environ.get("CARD_PARALLEL_MIN_PIXELS", "2000000"))
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+# ====== Warm caches ======
+# Font, background tema, QR dan thumbnail di-cache per proses. Di gunicorn (preload_app) warm_up() jalan di
+# master sebelum fork, jadi semua worker berbagi cache yang sama secara copy-on-write.
+BG_CACHE_MB = int(os.environ.get("CARD_BG_CACHE_MB", "96"))
+BG_CACHE_MAX_PIXELS = 2_000_000  # background lebih besar dari ini tidak di-cache
+WARMUP_SIZES = [s for s in os.environ.get("CARD_WARMUP_SIZES", "1050x600,1004x614,1260x756").split(",") if s]
+_bg_cache = OrderedDict()
+_bg_cache_bytes = 0
+_bg_cache_lock = threading.Lock()
+_render_memos = weakref.WeakSet()  # semua lru_cache di jalur render, lihat render_memo()
+_ready = threading.Event()
+_warmup_thread = None
+# Cache aset di disk (background, QR) dipakai bersama semua worker & bertahan setelah restart
+ASSET_CACHE_DIR = os.environ.get("CARD_ASSET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "card_maker_assets"))
+ASSET_CACHE_MB = int(os.environ.get("CARD_ASSET_CACHE_MB", "512"))  # 0 = mati
+ASSET_CACHE_VERSION = 2  # naikkan bila hasil render berubah supaya aset lama tidak terpakai
+
+# ====== Admission control ======
+# Preview dibatasi token bucket per sesi (cookie `cid` bertanda tangan HMAC) dan per IP; semua render antre di
+# slot terbatas dengan generate final didahulukan. Request yang tidak kebagian dijawab 429 "busy" + Retry-After.
+# Tanpa CARD_SECRET_KEY kunci dibuat acak saat start (preload_app: sama untuk semua worker, berganti tiap restart).
+CLIENT_SECRET = (os.environ.get("CARD_SECRET_KEY") or os.urandom(32).hex()).encode()
+RENDER_SLOTS = int(os.environ.get("CARD_RENDER_SLOTS", str(max(2, os.cpu_count() or 1))))
+PREVIEW_RATE = float(os.environ.get("CARD_PREVIEW_RATE", "4"))      # token per detik per sesi
+PREVIEW_BURST = float(os.environ.get("CARD_PREVIEW_BURST", "8"))
+IP_RATE_FACTOR = float(os.environ.get("CARD_IP_RATE_FACTOR", "4"))  # satu IP bisa berisi beberapa sesi (NAT)
+PREVIEW_QUEUE_TIMEOUT = float(os.environ.get("CARD_PREVIEW_QUEUE_TIMEOUT", "2"))
+GENERATE_QUEUE_TIMEOUT = float(os.environ.get("CARD_GENERATE_QUEUE_TIMEOUT", "60"))
+PRIORITY_GENERATE, PRIORITY_PREVIEW = 0, 1
+
+# ====== Quality governor ======
+# Di bawah tekanan (antrean slot render / latensi preview naik) preview dirender lebih kecil, dengan background
+# draft (tanpa blur), resize logo cepat & PNG kompresi ringan; response diberi header X-Card-Quality.
+# Generate final, job & export selalu kualitas penuh.
+QUALITY_GOVERNOR = os.environ.get("CARD_QUALITY_GOVERNOR", "1").lower() not in ("0", "false", "no", "off")
+DEGRADE_LATENCY_MS = float(os.environ.get("CARD_DEGRADE_LATENCY_MS", "800"))  # EWMA latensi preview -> level 1 (2x -> level 2)
+DEGRADE_QUEUE_DEPTH = float(os.environ.get("CARD_DEGRADE_QUEUE_DEPTH", "1"))  # render antre per slot -> level 1 (2x -> level 2)
+QUALITY_EWMA_ALPHA = 0.2
+QUALITY_DECAY_SECONDS = 5.0  # EWMA meluruh separuh tiap periode tanpa preview
+QUALITY_RECOVER = 0.7        # kembali naik kualitas hanya bila tekanan < level * nilai ini (histeresis)
+QUALITY_LEVELS = (
+    {"name": "full", "scale": 1.0, "draft": False, "resample": Image.LANCZOS, "png_level": 6},
+    {"name": "reduced", "scale": 0.6, "draft": True, "resample": Image.BILINEAR, "png_level": 1},
+    {"name": "minimal", "scale": 0.4, "draft": True, "resample": Image.BILINEAR, "png_level": 1},
+)
+QUALITY = {q["name"]: q for q in QUALITY_LEVELS}
+
+# ====== Logo store (JSON API) ======
+LOGO_DIR = os.environ.get("CARD_LOGO_DIR", os.path.join(tempfile.gettempdir(), "card_maker_logos"))
+os.makedirs(LOGO_DIR, exist_ok=True)
+LOGO_MAX_BYTES = 5 * 1024 * 1024
+LOGO_TTL_HOURS = int(os.environ.get("CARD_LOGO_TTL_HOURS", "24"))  # sejak terakhir dipakai
+LOGO_ID_RE = re.compile(r"[0-9a-f]{32}")
+PREVIEW_CACHE_ITEMS = 64  # preview PNG terakhir per proses, key = CardSpec.key
+PREVIEW_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# ====== Theme gallery ======
+GALLERY_THUMB_WIDTH = 320
+GALLERY_MAX_THUMB_WIDTH = 640
+GALLERY_MAX_TILES = int(os.environ.get("CARD_GALLERY_MAX_TILES", "120"))  # tema x aksen per request
+
+# ====== Background jobs ======
+JOB_DB = os.environ.get("CARD_JOB_DB", os.path.join(tempfile.gettempdir(), "card_maker_jobs", "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("CARD_JOB_WORKERS", "1"))  # thread worker per proses; 0 = tidak memproses job
+JOB_MAX_CARDS = int(os.environ.get("CARD_JOB_MAX_CARDS", "50"))
+JOB_STALE_SECONDS = float(os.environ.get("CARD_JOB_STALE_SECONDS", "300"))  # tanpa progres selama ini = worker mati
+JOB_MAX_ATTEMPTS = 3
+JOB_RETENTION_HOURS = 12  # sama dengan umur file hasil
+JOB_POLL_INTERVAL = 0.5
+JOB_EVENTS_MAX_SECONDS = float(os.environ.get("CARD_JOB_EVENTS_MAX_SECONDS", "60"))  # umur maks satu koneksi SSE
+JOB_EVENTS_KEEPALIVE = 10
+
+# ====== Slow-render capture ======
+# Opt-in: render di atas ambang ini (ms) disimpan lengkap (payload + logo + timing) untuk replay.py
+SLOW_CAPTURE_MS = float(os.environ.get("CARD_SLOW_CAPTURE_MS", "0"))  # 0 = mati
+SLOW_CAPTURE_SAMPLE = float(os.environ.get("CARD_SLOW_CAPTURE_SAMPLE", "1.0"))  # porsi render lambat yang disimpan
+SLOW_CAPTURE_DIR = os.environ.get("CARD_SLOW_CAPTURE_DIR", os.path.join(tempfile.gettempdir(), "card_maker_slow"))
+SLOW_CAPTURE_MB = int(os.environ.get("CARD_SLOW_CAPTURE_MB", "64"))
+
+# ====== Memory diagnostics ======
+# Opt-in: tracemalloc + RSS per tahap render & per endpoint, dan diff snapshot berkala (situs alokasi yang
+# tumbuh) di /debug/memory. Recycle worker berdasarkan RSS jalan juga tanpa tracing (lihat gunicorn.conf.py).
+MEMORY_TRACE = os.environ.get("CARD_MEMORY_TRACE", "0").lower() in ("1", "true", "yes", "on")
+MEMORY_TRACE_FRAMES = int(os.environ.get("CARD_MEMORY_TRACE_FRAMES", "4"))
+MEMORY_SNAPSHOT_SECONDS = float(os.environ.get("CARD_MEMORY_SNAPSHOT_SECONDS", "300"))  # 0 = hanya manual
+MEMORY_RECYCLE_MB = int(os.environ.get("CARD_MEMORY_RECYCLE_MB", "0"))  # RSS worker; 0 = tidak pernah recycle
+MEMORY_TOP_SITES = 15
+MEMORY_RSS_HISTORY = 48  # sampel RSS (satu per snapshot) yang disimpan untuk melihat tren
 
 
 # ====== Theme & Palette ======
+# Tema deklaratif: warna teks, flag gelap, dan daftar layer background yang dilukis berurutan.
+# Spec divalidasi & dikompilasi sekali menjadi RenderPlan (lihat compile_theme); tipe layer:
+#   fill     {"color"}                                   warna solid
+#   gradient {"from", "to", "shade": (lo, hi)}           ramp horizontal x kecerahan vertikal
+#   sheen    {"base", "du", "dv", "clamp": (lo, hi)}     kanal = 255 * (base + du*u + dv*v), di-clamp
+#   stripe   {"base", "color"}                           bidang diagonal 45° (pola Tech Stripe)
+#   blobs    {"blobs": [{"at", "radius", "color", "alpha"}], "blur", "min_blur"}  glow elips + blur
+#   checker  {"step", "colors", "base", "blur", "opacity"}                         tekstur kotak (carbon)
+#   lines    {"density", "min_gap", "color"}             garis diagonal tipis, jarak max(min_gap, W // density)
+#   panel    {"color"}                                   panel rounded solid
+#   glass    {"alpha", "outline_alpha", "blur"}          panel kaca semi transparan
 THEMES = {
     # existing
-    "pro-clean":   {"title": "Pro Clean", "bg": (255, 255, 255), "fg": (28, 28, 32), "sub": (110, 116, 125), "panel": (255, 255, 255)},
-    "pro-modern":  {"title": "Pro Modern", "bg": (244, 247, 252), "fg": (21, 24, 31), "sub": (105, 113, 123), "panel": (255, 255, 255)},
-    "pro-dark":    {"title": "Pro Dark", "bg": (18, 18, 22), "fg": (235, 238, 243), "sub": (160, 170, 182), "panel": (26, 27, 33)},
-    "pro-glass":   {"title": "Glass Subtle", "bg": (15, 19, 23), "fg": (232, 238, 242), "sub": (180, 195, 205), "panel": "glass"},
-    "pro-gradient": {"title": "Soft Gradient", "bg": "gradient", "fg": (255, 255, 255), "sub": (235, 235, 235), "panel": "glass"},
-    "pro-kraft":   {"title": "Kraft Warm", "bg": (234, 219, 198), "fg": (48, 38, 30), "sub": (95, 78, 60), "panel": (236, 224, 206)},
-    "pro-mono":    {"title": "Monochrome", "bg": (250, 250, 250), "fg": (20, 20, 20), "sub": (90, 90, 90), "panel": (255, 255, 255)},
-    "pro-stripe":  {"title": "Tech Stripe", "bg": "stripe", "fg": (24, 28, 36), "sub": (98, 108, 124), "panel": (255, 255, 255)},
+    "pro-clean":   {"title": "Pro Clean", "fg": (28, 28, 32), "sub": (110, 116, 125), "dark": False,
+                    "layers": [{"type": "fill", "color": (255, 255, 255)}, {"type": "panel", "color": (255, 255, 255)}]},
+    "pro-modern":  {"title": "Pro Modern", "fg": (21, 24, 31), "sub": (105, 113, 123), "dark": False,
+                    "layers": [{"type": "fill", "color": (244, 247, 252)}, {"type": "panel", "color": (255, 255, 255)}]},
+    "pro-dark":    {"title": "Pro Dark", "fg": (235, 238, 243), "sub": (160, 170, 182), "dark": True,
+                    "layers": [{"type": "fill", "color": (18, 18, 22)}, {"type": "panel", "color": (26, 27, 33)}]},
+    "pro-glass":   {"title": "Glass Subtle", "fg": (232, 238, 242), "sub": (180, 195, 205), "dark": True,
+                    "layers": [{"type": "fill", "color": (15, 19, 23)}, {"type": "glass"}]},
+    "pro-gradient": {"title": "Soft Gradient", "fg": (255, 255, 255), "sub": (235, 235, 235), "dark": True,
+                     "layers": [{"type": "gradient", "from": (14, 165, 233), "to": (139, 92, 246), "shade": (0.85, 1.15)},
+                                {"type": "glass"}]},
+    "pro-kraft":   {"title": "Kraft Warm", "fg": (48, 38, 30), "sub": (95, 78, 60), "dark": False,
+                    "layers": [{"type": "fill", "color": (234, 219, 198)}, {"type": "panel", "color": (236, 224, 206)}]},
+    "pro-mono":    {"title": "Monochrome", "fg": (20, 20, 20), "sub": (90, 90, 90), "dark": False,
+                    "layers": [{"type": "fill", "color": (250, 250, 250)}, {"type": "panel", "color": (255, 255, 255)}]},
+    "pro-stripe":  {"title": "Tech Stripe", "fg": (24, 28, 36), "sub": (98, 108, 124), "dark": False,
+                    "layers": [{"type": "stripe", "base": (140, 140, 140), "color": (243, 246, 255)},
+                               {"type": "panel", "color": (255, 255, 255)}]},
     # NEW premium themes
-    "pro-aurora":  {"title": "Aurora Glow", "bg": "aurora", "fg": (240, 244, 255), "sub": (210, 220, 240), "panel": "glass"},
-    "pro-carbon":  {"title": "Carbon Fiber", "bg": "carbon", "fg": (234, 237, 243), "sub": (160, 170, 182), "panel": (18, 19, 23)},
-    "pro-lines":   {"title": "Geo Lines", "bg": "lines", "fg": (24, 28, 36), "sub": (98, 108, 124), "panel": (255, 255, 255)},
-    "pro-satin":   {"title": "Satin Sheen", "bg": "satin", "fg": (22, 24, 28), "sub": (80, 88, 98), "panel": (255, 255, 255)},
+    "pro-aurora":  {"title": "Aurora Glow", "fg": (240, 244, 255), "sub": (210, 220, 240), "dark": True,
+                    "layers": [{"type": "fill", "color": (7, 10, 16)},
+                               {"type": "blobs", "blur": 0.01, "min_blur": 8, "blobs": [
+                                   {"at": (0.2, 0.3), "radius": (0.06, 0.04), "color": (14, 165, 233), "alpha": 120},
+                                   {"at": (0.7, 0.2), "radius": (0.08, 0.06), "color": (139, 92, 246), "alpha": 110},
+                                   {"at": (0.6, 0.75), "radius": (0.07, 0.05), "color": (20, 184, 166), "alpha": 100},
+                               ]},
+                               {"type": "glass"}]},
+    "pro-carbon":  {"title": "Carbon Fiber", "fg": (234, 237, 243), "sub": (160, 170, 182), "dark": True,
+                    "layers": [{"type": "checker", "step": 8, "colors": ((24, 26, 32), (20, 22, 27)), "base": (18, 19, 23),
+                                "blur": 0.6, "opacity": 0.35},
+                               {"type": "panel", "color": (18, 19, 23)}]},
+    "pro-lines":   {"title": "Geo Lines", "fg": (24, 28, 36), "sub": (98, 108, 124), "dark": False,
+                    "layers": [{"type": "fill", "color": (245, 246, 248)},
+                               {"type": "lines", "density": 60, "min_gap": 12, "color": (220, 226, 234)},
+                               {"type": "panel", "color": (255, 255, 255)}]},
+    "pro-satin":   {"title": "Satin Sheen", "fg": (22, 24, 28), "sub": (80, 88, 98), "dark": False,
+                    "layers": [{"type": "sheen", "base": (0.92, 0.95, 0.98), "du": (0.08, -0.18, -0.28),
+                                "dv": (-0.22, 0.0, -0.05), "clamp": (210, 255)},
+                               {"type": "panel", "color": (255, 255, 255)}]},
 }
 
 PALETTES = [
@@ -226,7 +424,7 @@ HTML = r"""
             <div class="md:col-span-2">
               <div class="label mb-1">Logo (PNG/JPG, opsional)</div>
               <label class="inpt flex items-center justify-between gap-3 cursor-pointer" @dragover.prevent @drop.prevent="handleDrop($event)">
-                <input id="logoInput" type="file" name="logo" accept="image/*" class="sr-only" @change="debouncedPreview">
+                <input id="logoInput" type="file" name="logo" accept="image/*" class="sr-only" @change.stop="onLogo()">
                 <span class="text-sm">Seret & lepas logo ke sini atau klik untuk memilih</span>
                 <span class="badge">Opsional</span>
               </label>
@@ -249,6 +447,13 @@ HTML = r"""
               <div class="label mb-1">DPI untuk PDF</div>
               <input class="inpt" name="dpi" value="300">
             </div>
+            <div>
+              <div class="label mb-1">Warna PDF</div>
+              <select class="inpt" name="color">
+                <option value="rgb">RGB (layar / digital)</option>
+                <option value="cmyk">CMYK (cetak)</option>
+              </select>
+            </div>
           </div>
 
           <!-- Tema -->
@@ -312,6 +517,13 @@ HTML = r"""
         </form>
       </div>
 
+      {% if error %}
+      <div class="card p-5" style="border-color:#fca5a5">
+        <div class="font-semibold">Gagal membuat kartu</div>
+        <div class="muted mt-1">{{ error }}</div>
+      </div>
+      {% endif %}
+
       {% if png_url or pdf_url %}
       <div class="card p-5">
         <div class="flex items-center justify-between gap-3 flex-wrap">
@@ -326,6 +538,24 @@ HTML = r"""
         </div>
       </div>
       {% endif %}
+
+      <template x-if="job">
+        <div class="card p-5">
+          <div class="font-semibold" x-text="job.status==='done' ? 'Hasil kartu siap' : (job.status==='failed' ? 'Gagal membuat kartu' : 'Sedang membuat kartu…')"></div>
+          <div class="muted mt-1" x-text="job.status==='failed' ? job.error : job.stage"></div>
+          <div class="mt-3 h-2 rounded-full bg-[var(--border)]" x-show="job.status==='queued' || job.status==='running'">
+            <div class="h-2 rounded-full bg-blue-500 transition-all" :style="'width:' + Math.round(job.progress*100) + '%'"></div>
+          </div>
+          <div class="mt-4 flex flex-wrap gap-2" x-show="job.status==='done'">
+            <template x-for="(c, i) in job.cards" :key="i">
+              <div class="flex gap-2">
+                <a class="btn" :href="c.png_url" download="business_card.png">⬇️ PNG</a>
+                <a class="btn" :href="c.pdf_url" download="business_card.pdf">⬇️ PDF</a>
+              </div>
+            </template>
+          </div>
+        </div>
+      </template>
     </section>
 
     <!-- Right: Live Preview (Server-rendered) -->
@@ -337,6 +567,7 @@ HTML = r"""
           <div x-show="loading" class="absolute inset-0 grid place-items-center"><div class="animate-pulse text-sm" style="color:var(--dim)">Merender preview…</div></div>
           <img x-ref="previewImg" src="" alt="preview" class="w-full h-auto block" style="min-height:140px;">
         </div>
+        <div x-show="degraded" class="text-xs mt-2" style="color:var(--dim)">Server sedang sibuk: preview disederhanakan sementara. Hasil Generate tetap kualitas penuh.</div>
         <div class="text-xs mt-2 muted">Jika preview tidak update, pastikan logo sudah dipilih (jika ingin dipakai) lalu ubah salah satu input kecil agar refresh.</div>
       </div>
 
@@ -489,6 +720,11 @@ HTML = r"""
         loading:false,
         logoName:'',
         debouncedPreview:null,
+        previewSeq:0,
+        retryTimer:null,
+        degraded:false,
+        job:null,
+        logoId:'',
         toggle(){
           this.dark=!this.dark;
           localStorage.setItem('theme', this.dark?'dark':'light');
@@ -510,30 +746,93 @@ HTML = r"""
           const form=document.getElementById('cardForm');
           form.reset();
           this.logoName='';
+          this.logoId='';
           this.updatePreview();
         },
-        beforeSubmit(e){ /* keep defaults */ },
+        beforeSubmit(e){
+          // generate lewat antrean job (tidak menahan worker web); gagal submit -> POST / biasa
+          if(!window.fetch) return;
+          e.preventDefault();
+          const form=e.target;
+          this.job={status:'queued', progress:0, stage:'antre', cards:[], error:null};
+          fetch('/api/jobs', { method:'POST', body:new FormData(form) })
+            .then(async r=>{
+              const j=await r.json().catch(()=>({}));
+              if(r.status===400){ this.job={status:'failed', progress:0, cards:[], error:j.error}; return; }
+              if(!r.ok) throw new Error();
+              this.pollJob(j.status_url);
+            })
+            .catch(()=>{ this.job=null; form.submit(); });
+        },
+        pollJob(url){
+          // polling, bukan SSE: koneksi SSE menahan satu thread worker web selama job berjalan
+          fetch(url).then(r=>r.json())
+            .then(s=>{ this.job=s; if(s.status!=='done' && s.status!=='failed') setTimeout(()=>this.pollJob(url), 1000); })
+            .catch(()=>setTimeout(()=>this.pollJob(url), 2000));
+        },
         applyPreset(e){
           const v=e.target.value; if(!v) return; this.$refs.sizeInput.value=v; this.updatePreview();
         },
         handleDrop(ev){
           const files=ev.dataTransfer.files; if(!files||!files.length) return;
           const input=document.getElementById('logoInput');
-          input.files = files; this.logoName = files[0].name; this.updatePreview();
+          input.files = files; this.logoName = files[0].name; this.onLogo();
         },
-        updatePreview(){
+        onLogo(){
+          // logo di-upload sekali; preview berikutnya cukup JSON ringan dengan logo_id
+          const input=document.getElementById('logoInput');
+          const f=input && input.files[0];
+          this.logoId='';
+          if(!f) return this.updatePreview();
+          const fd=new FormData(); fd.append('logo', f);
+          fetch('/api/logos', { method:'POST', body: fd })
+            .then(r=>r.ok ? r.json() : Promise.reject())
+            .then(j=>{ this.logoId=j.logo_id; })
+            .catch(()=>{})
+            .finally(()=>this.updatePreview());
+        },
+        updatePreview(multipart=false){
           const form=document.getElementById('cardForm'); if(!form) return;
           const fd=new FormData(form);
+          const input=document.getElementById('logoInput');
+          // JSON CardSpec kecuali logo belum ter-upload (atau server menolak spec: form multipart lebih longgar)
+          const useJson = !multipart && !(input && input.files.length && !this.logoId);
+          const spec={};
+          if(useJson){
+            ['name','title','company','email','phone','address','url','theme','accent','size'].forEach(k=>{ const v=fd.get(k); if(v!==null) spec[k]=v; });
+            if(this.logoId) spec.logo_id=this.logoId;
+          }
+          const seq=++this.previewSeq;
+          clearTimeout(this.retryTimer);
           this.loading=true;
-          fetch('/api/preview', { method:'POST', body: fd })
-            .then(r=>r.ok?r.blob():Promise.reject())
+          const req = useJson
+            ? fetch('/api/card/preview', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(spec) })
+            : fetch('/api/preview', { method:'POST', body: fd });
+          req
+            .then(async r=>{
+              if(seq!==this.previewSeq) return null;  // sudah ada preview yang lebih baru
+              if(useJson && r.status===400){ this.updatePreview(true); return null; }
+              if(r.status===429){
+                // server sibuk: coba lagi nanti dengan isi form terbaru
+                const j=await r.json().catch(()=>({}));
+                const ms=j.retry_after_ms || (parseFloat(r.headers.get('Retry-After')||'1')*1000);
+                this.retryTimer=setTimeout(()=>this.updatePreview(), Math.max(250, ms));
+                return null;
+              }
+              if(!r.ok) return Promise.reject();
+              // server sibuk: preview disederhanakan; minta versi penuh lagi setelah beban turun
+              this.degraded = (r.headers.get('X-Card-Quality')||'full')!=='full';
+              if(this.degraded) this.retryTimer=setTimeout(()=>this.updatePreview(), 4000);
+              return r.blob();
+            })
             .then(blob=>{
+              if(!blob || seq!==this.previewSeq) return;
               const url=URL.createObjectURL(blob);
               this.$refs.previewImg.src=url;
               setTimeout(()=>URL.revokeObjectURL(url), 10000);
               this.loading=false;
             })
-            .catch(()=>{ this.loading=false; });
+            .catch(()=>{ if(seq===this.previewSeq) this.loading=false; });
         }
       }
     }
@@ -631,8 +930,482 @@ HTML = r"""
 </html>
 """
 
+# ====== Persistent asset cache ======
+
+class AssetCache:
+    """
+    Cache aset render di disk yang dipakai bersama semua worker dan bertahan setelah restart/deploy.
+    File dinamai hash dari key (content-addressed) dan dibaca lewat mmap, jadi page cache OS berbagi
+    isinya antar proses. Index sqlite mencatat ukuran & akses terakhir untuk eviction LRU berbasis ukuran.
+    Penulis bersamaan aman: isi ditulis ke file sementara lalu os.replace (atomik), index lewat transaksi.
+    Semua error I/O diperlakukan sebagai miss: cache tidak pernah menggagalkan render.
+    """
+
+    TOUCH_INTERVAL = 60  # detik; akses terakhir di index cukup diperbarui sesekali
+    SYNC_INTERVAL = 60   # detik; total ukuran berjalan dicocokkan ulang dengan index (proses lain ikut menulis)
+    _IMAGE_HEADER = struct.Struct("<4s8sII")  # magic, mode, width, height
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched = {}   # digest -> waktu atime terakhir ditulis; hanya yang < TOUCH_INTERVAL yang disimpan
+        self._total = None   # perkiraan total ukuran (proses ini); None = belum dibaca dari index
+        self._synced = 0.0
+        self.enabled = max_bytes > 0
+        if self.enabled:
+            try:
+                os.makedirs(root, exist_ok=True)
+                with self._db() as db:
+                    db.execute("CREATE TABLE IF NOT EXISTS assets (digest TEXT PRIMARY KEY, key TEXT, "
+                               "size INTEGER NOT NULL, atime REAL NOT NULL)")
+                    db.execute("CREATE INDEX IF NOT EXISTS assets_atime ON assets (atime)")
+            except (OSError, sqlite3.Error):
+                self.enabled = False
+
+    def _db(self) -> sqlite3.Connection:
+        # koneksi per thread & per proses (koneksi sqlite tidak boleh ikut ter-fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def digest(key) -> str:
+        return hashlib.sha256(repr((ASSET_CACHE_VERSION, key)).encode()).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get_bytes(self, key):
+        """Isi aset sebagai buffer read-only (mmap), atau None bila belum ada."""
+        if not self.enabled:
+            return None
+        digest = self.digest(key)
+        try:
+            with open(self._path(digest), "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        with self._lock:
+            stale = now - self._touched.get(digest, 0) > self.TOUCH_INTERVAL
+            if stale:
+                self._touched[digest] = now
+        if stale:
+            try:
+                self._db().execute("UPDATE assets SET atime = ? WHERE digest = ?", (now, digest))
+            except sqlite3.Error:
+                pass
+        return buf
+
+    def put_bytes(self, key, data: bytes):
+        if not self.enabled:
+            return
+        digest = self.digest(key)
+        path = self._path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO assets (digest, key, size, atime) VALUES (?, ?, ?, ?)",
+                       (digest, repr(key)[:200], len(data), time.time()))
+            if self._grow(len(data)):
+                self._evict(db)
+        except (OSError, sqlite3.Error):
+            pass
+
+    def _grow(self, nbytes: int) -> bool:
+        """
+        Tambah total berjalan; True bila index perlu dicek (total lewat budget, belum pernah dibaca, atau sudah
+        SYNC_INTERVAL sejak sinkron terakhir). Jadi SUM(size) tidak dijalankan di setiap put pada jalur render.
+        """
+        now = time.time()
+        with self._lock:
+            if self._total is not None:
+                self._total += nbytes
+                if self._total <= self.max_bytes and now - self._synced < self.SYNC_INTERVAL:
+                    return False
+            self._synced = now
+            # catatan touch yang sudah lewat TOUCH_INTERVAL tidak lagi menahan UPDATE atime: buang
+            self._touched = {d: t for d, t in self._touched.items() if now - t <= self.TOUCH_INTERVAL}
+            return True
+
+    def _evict(self, db: sqlite3.Connection):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+        if total <= self.max_bytes:
+            self._total = total
+            return
+        # satu evicter pada satu waktu; buang yang paling lama tak dipakai sampai 90% budget
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+            victims = []
+            for digest, size in db.execute("SELECT digest, size FROM assets ORDER BY atime").fetchall():
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(self._path(digest))  # pembaca yang masih me-mmap tetap aman
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue  # file & baris tetap ada: ukurannya tetap dihitung, coba korban berikutnya
+                db.execute("DELETE FROM assets WHERE digest = ?", (digest,))
+                victims.append(digest)
+                total -= size
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._total = total
+            for digest in victims:
+                self._touched.pop(digest, None)
+
+    def get_image(self, key):
+        buf = self.get_bytes(key)
+        if buf is None:
+            return None
+        try:
+            magic, mode, w, h = self._IMAGE_HEADER.unpack_from(buf)
+            mode = mode.rstrip(b"\0").decode()
+            if magic != b"CCA1" or len(buf) != self._IMAGE_HEADER.size + w * h * Image.getmodebands(mode):
+                return None
+            # zero-copy untuk mode 4 byte/piksel (RGBA): image read-only langsung di atas mmap
+            return Image.frombuffer(mode, (w, h), memoryview(buf)[self._IMAGE_HEADER.size:], "raw", mode, 0, 1)
+        except (struct.error, ValueError, KeyError):
+            return None
+
+    def put_image(self, key, img: Image.Image):
+        header = self._IMAGE_HEADER.pack(b"CCA1", img.mode.encode(), img.width, img.height)
+        self.put_bytes(key, header + img.tobytes())
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        count, total = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets").fetchone()
+        return {"enabled": True, "entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+
+asset_cache = AssetCache(ASSET_CACHE_DIR, ASSET_CACHE_MB * 1024 * 1024)
+
+
+# ====== Render tracing & slow-render capture ======
+# stage() mencatat durasi tiap tahap render ke trace milik thread yang sedang di-capture (tanpa trace: no-op).
+# capture_render() membungkus satu render; bila total melewati SLOW_CAPTURE_MS, payload lengkap (termasuk
+# logo) + timing disimpan ke spool lokal berukuran terbatas untuk diputar ulang dengan replay.py.
+_trace = threading.local()
+
+
+@contextmanager
+def stage(name: str):
+    timings = getattr(_trace, "timings", None)
+    mark = memory_monitor.begin() if memory_monitor.enabled else None
+    if timings is None and mark is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+        if mark is not None:
+            memory_monitor.end(mark, "stage", name)
+
+
+def traced(name: str):
+    """Dekorator: seluruh fungsi dihitung sebagai tahap `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+@contextmanager
+def trace_stages():
+    """Kumpulkan timing stage() di thread ini selama blok berjalan; yield dict {tahap: ms}."""
+    outer = getattr(_trace, "timings", None)
+    timings = _trace.timings = {}
+    try:
+        yield timings
+    finally:
+        _trace.timings = outer
+
+
+@contextmanager
+def capture_render(kind: str, payload: dict):
+    """Ukur satu render (preview/generate/job) dan simpan ke spool bila lambat. Yield dict timing per tahap."""
+    if SLOW_CAPTURE_MS <= 0:
+        yield {}
+        return
+    logo = payload.get("logo")
+    logo_bytes = logo.read() if logo is not None else None
+    if logo_bytes is not None:
+        payload["logo"] = io.BytesIO(logo_bytes)  # stream upload hanya bisa dibaca sekali
+    t0 = time.perf_counter()
+    with trace_stages() as timings:
+        try:
+            yield timings
+        finally:
+            total = (time.perf_counter() - t0) * 1000
+    if total >= SLOW_CAPTURE_MS and random.random() < SLOW_CAPTURE_SAMPLE:
+        _write_capture(kind, payload, logo_bytes, total, timings)
+
+
+def _write_capture(kind, payload, logo_bytes, total_ms, timings):
+    record = {
+        "kind": kind,
+        "captured_at": time.time(),
+        "total_ms": round(total_ms, 2),
+        "stages_ms": {k: round(v, 2) for k, v in timings.items()},
+        "payload": {k: v for k, v in payload.items() if k != "logo"},
+        "logo_sha256": hashlib.sha256(logo_bytes).hexdigest() if logo_bytes else None,
+        "logo": base64.b64encode(logo_bytes).decode() if logo_bytes else None,
+    }
+    try:
+        os.makedirs(SLOW_CAPTURE_DIR, exist_ok=True)
+        name = f"{int(record['captured_at'] * 1000)}-{kind}-{uuid.uuid4().hex[:8]}.json"
+        fd, tmp = tempfile.mkstemp(dir=SLOW_CAPTURE_DIR, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp, os.path.join(SLOW_CAPTURE_DIR, name))
+        _trim_captures()
+    except OSError:
+        pass  # capture hanya alat diagnosa: jangan pernah menggagalkan request
+
+
+def _trim_captures():
+    # buang capture tertua sampai spool di bawah SLOW_CAPTURE_MB
+    entries = []
+    for name in os.listdir(SLOW_CAPTURE_DIR):
+        if name.endswith(".json"):
+            path = os.path.join(SLOW_CAPTURE_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+    total = sum(e[2] for e in entries)
+    for _, name, size in sorted(entries):
+        if total <= SLOW_CAPTURE_MB * 1024 * 1024:
+            break
+        try:
+            os.remove(os.path.join(SLOW_CAPTURE_DIR, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def read_capture(path: str) -> dict:
+    """Baca capture dari spool; `payload` sudah siap untuk render_card (logo sebagai BytesIO)."""
+    with open(path) as f:
+        record = json.load(f)
+    logo = base64.b64decode(record["logo"]) if record.get("logo") else None
+    record["payload"]["logo"] = io.BytesIO(logo) if logo else None
+    return record
+
+
+# ====== Memory accounting ======
+# Pillow mengalokasikan buffer gambar dengan malloc biasa (tidak terlihat tracemalloc), jadi tiap pengukuran
+# mencatat tiga hal: puncak heap Python (tracemalloc: BytesIO, bytes, stream upload), selisih RSS, dan jumlah
+# Image baru dari statistik Pillow. Angkanya global per proses: dengan banyak thread, pengukuran yang
+# tumpang tindih ikut memuat alokasi thread lain (cukup untuk menunjuk tahap/endpoint yang boros).
+
+def rss_bytes() -> int:
+    """RSS proses saat ini (Linux /proc/self/statm); 0 bila tidak tersedia."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return 0
+
+
+class MemoryMonitor:
+    def __init__(self, enabled: bool, frames=MEMORY_TRACE_FRAMES, interval=MEMORY_SNAPSHOT_SECONDS, recycle_mb=MEMORY_RECYCLE_MB):
+        self.enabled = enabled
+        self.interval = interval
+        self.recycle_bytes = recycle_mb * 1024 * 1024
+        self.recycle_pending = False
+        self.stats = {"stage": {}, "endpoint": {}}
+        self.growth = []          # situs alokasi yang paling tumbuh pada diff snapshot terakhir
+        self.growth_at = None
+        self.rss_history = []     # [(waktu, rss_bytes)] per snapshot
+        self._open = []           # pengukuran yang sedang berjalan: [traced awal, puncak traced, rss awal, jumlah Image awal]
+        self._snapshot = None
+        self._thread = None
+        self._lock = threading.Lock()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def _fold(self):
+        # puncak global dioper ke semua pengukuran yang terbuka sebelum di-reset, jadi pengukuran bersarang
+        # maupun paralel tetap melihat puncak di sepanjang intervalnya masing-masing
+        current, peak = tracemalloc.get_traced_memory()
+        for mark in self._open:
+            mark[1] = max(mark[1], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def begin(self) -> list:
+        rss = rss_bytes()
+        with self._lock:
+            current = self._fold()
+            mark = [current, current, rss, Image.core.get_stats()["new_count"]]
+            self._open.append(mark)
+        return mark
+
+    def end(self, mark: list, kind: str, name: str):
+        rss = rss_bytes()
+        with self._lock:
+            current = self._fold()
+            self._open.remove(mark)
+            s = self.stats[kind].setdefault(name, {"count": 0, "peak": 0, "peak_sum": 0, "retained_sum": 0,
+                                                   "rss_max": 0, "rss_sum": 0, "images_max": 0, "images_sum": 0})
+            peak, images, rss_delta = mark[1] - mark[0], Image.core.get_stats()["new_count"] - mark[3], rss - mark[2]
+            s["count"] += 1
+            s["peak"] = max(s["peak"], peak)
+            s["peak_sum"] += peak
+            s["retained_sum"] += current - mark[0]
+            s["rss_max"] = max(s["rss_max"], rss_delta)
+            s["rss_sum"] += rss_delta
+            s["images_max"] = max(s["images_max"], images)
+            s["images_sum"] += images
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        if not self.enabled:
+            yield
+            return
+        mark = self.begin()
+        try:
+            yield
+        finally:
+            self.end(mark, kind, name)
+
+    def start(self):
+        """Thread snapshot berkala; aman dipanggil per request (thread tidak ikut ter-fork, jadi dibuat ulang)."""
+        if not self.enabled or self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._snapshot_loop, name="card-memory", daemon=True)
+                self._thread.start()
+
+    def _snapshot_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.take_snapshot()
+            except Exception:
+                pass  # diagnosa tidak boleh mematikan worker
+
+    def take_snapshot(self) -> list:
+        """Snapshot tracemalloc + diff dengan snapshot sebelumnya; return situs alokasi yang paling tumbuh."""
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        with self._lock:
+            prev, self._snapshot = self._snapshot, snap
+            self.rss_history = (self.rss_history + [(time.time(), rss_bytes())])[-MEMORY_RSS_HISTORY:]
+        if prev is None:
+            return []
+        growth = []
+        for stat in snap.compare_to(prev, "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            growth.append({"site": f"{frame.filename}:{frame.lineno}", "size_diff_kb": round(stat.size_diff / 1024, 1),
+                           "size_kb": round(stat.size / 1024, 1), "count_diff": stat.count_diff})
+            if len(growth) >= MEMORY_TOP_SITES:
+                break
+        self.growth, self.growth_at = growth, time.time()
+        return growth
+
+    def should_recycle(self) -> bool:
+        """True bila RSS melewati CARD_MEMORY_RECYCLE_MB: worker sebaiknya diganti setelah request ini."""
+        if self.recycle_bytes <= 0:
+            return False
+        if rss_bytes() > self.recycle_bytes:
+            self.recycle_pending = True
+        return self.recycle_pending
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._open = []
+
+    def report(self) -> dict:
+        def kb(v):
+            return round(v / 1024, 1)
+
+        def table(kind):
+            with self._lock:
+                items = [(name, dict(s)) for name, s in self.stats[kind].items()]
+            return {name: {"count": s["count"], "py_peak_kb_max": kb(s["peak"]), "py_peak_kb_avg": kb(s["peak_sum"] / s["count"]),
+                           "py_retained_kb_avg": kb(s["retained_sum"] / s["count"]), "rss_delta_kb_max": kb(s["rss_max"]),
+                           "rss_delta_kb_avg": kb(s["rss_sum"] / s["count"]), "images_max": s["images_max"],
+                           "images_avg": round(s["images_sum"] / s["count"], 1)}
+                    for name, s in sorted(items)}
+
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        return {
+            "enabled": self.enabled, "pid": os.getpid(), "rss_mb": round(rss_bytes() / 1048576, 1),
+            "traced_mb": round(traced / 1048576, 1), "pillow": Image.core.get_stats(),
+            "stages": table("stage"), "endpoints": table("endpoint"),
+            "growth": self.growth, "growth_at": self.growth_at,
+            "rss_history_mb": [(round(t), round(v / 1048576, 1)) for t, v in self.rss_history],
+            "recycle_mb": self.recycle_bytes // 1048576, "recycle_pending": self.recycle_pending,
+        }
+
+
+memory_monitor = MemoryMonitor(MEMORY_TRACE)
+
+
+# ---------- Render memo ----------
+
+def render_memo(maxsize=128):
+    """functools.lru_cache yang terdaftar di _render_memos, supaya clear_render_caches() ikut mengosongkannya."""
+    def wrap(fn):
+        cached = functools.lru_cache(maxsize=maxsize)(fn)
+        _render_memos.add(cached)
+        return cached
+    return wrap
+
+
+def clear_render_caches():
+    """
+    Kosongkan semua cache render di memori proses ini (background, preview, QR, tile, glow, profil warna,
+    thumbnail tema): render berikutnya sama dinginnya dengan proses baru. Font tetap dimuat; cache disk
+    (asset_cache) tidak disentuh - matikan lewat asset_cache.enabled bila perlu.
+    """
+    global _bg_cache_bytes
+    with _bg_cache_lock:
+        _bg_cache.clear()
+        _bg_cache_bytes = 0
+    with _preview_cache_lock:
+        _preview_cache.clear()
+    for fn in list(_render_memos):
+        fn.cache_clear()
+
+
 # ====== Font & Utils ======
 
+@functools.lru_cache(maxsize=512)
 def load_font(size, weight="regular"):
     candidates = {
         "regular": ["Inter-Regular.ttf", "Montserrat-Regular.ttf", "DejaVuSans.ttf", "arial.ttf"],
@@ -671,14 +1444,23 @@ def parse_color(hexstr: str, default=(59, 130, 246)):
         return default
 
 
-def fit_logo(img: Image.Image, max_w: int, max_h: int) -> Image.Image:
-    iw, ih = img.size
+def logo_size(size, max_w: int, max_h: int):
+    iw, ih = size
     scale = min(max_w / iw, max_h / ih, 1.0)
-    nw, nh = int(iw * scale), int(ih * scale)
-    return img.resize((nw, nh), Image.LANCZOS)
+    return int(iw * scale), int(ih * scale)
 
 
-def make_qr(data: str, fill=(17, 24, 39), back=(255, 255, 255), box_size=10):
+def fit_logo(img: Image.Image, max_w: int, max_h: int) -> Image.Image:
+    return img.resize(logo_size(img.size, max_w, max_h), Image.LANCZOS)
+
+
+@render_memo(maxsize=64)
+def qr_matrix(data: str, box_size=10) -> Image.Image:
+    """Modul QR sebagai mask 'L' (255 = modul gelap), dipakai bersama oleh semua kombinasi warna."""
+    key = ("qr-matrix", data, box_size)
+    img = asset_cache.get_image(key)
+    if img is not None:
+        return img
     qr = qrcode.QRCode(
         version=None,
         error_correction=qrcode.constants.ERROR_CORRECT_H,
@@ -687,7 +1469,17 @@ def make_qr(data: str, fill=(17, 24, 39), back=(255, 255, 255), box_size=10):
     )
     qr.add_data(data)
     qr.make(fit=True)
-    img = qr.make_image(fill_color=fill, back_color=back).convert("RGBA")
+    img = qr.make_image(fill_color="white", back_color="black").convert("L")
+    asset_cache.put_image(key, img)
+    return img
+
+
+@render_memo(maxsize=256)
+def make_qr(data: str, fill=(17, 24, 39), back=(255, 255, 255), box_size=10):
+    # hasil di-cache & dipakai bersama: pemanggil tidak boleh memodifikasi image-nya
+    mask = qr_matrix(data, box_size)
+    img = Image.new("RGBA", mask.size, tuple(back) + (255,))
+    img.paste(tuple(fill) + (255,), (0, 0) + mask.size, mask)
     return img
 
 
@@ -722,133 +1514,612 @@ def wrap_text(draw, text, font, max_width):
     return lines
 
 
-def _draw_rounded_panel(canvas: Image.Image, fill=(255, 255, 255), alpha=55, outline_alpha=75, radius_factor=0.02, blur=0.5):
-    W, H = canvas.size
-    panel = Image.new("RGBA", (W, H), (255, 255, 255, 0))
-    d = ImageDraw.Draw(panel)
-    pad = int(W * 0.04)
-    d.rounded_rectangle([pad, pad, W - pad, H - pad], radius=int(W * radius_factor), fill=(255, 255, 255, alpha), outline=(255, 255, 255, outline_alpha), width=2)
-    return panel.filter(ImageFilter.GaussianBlur(blur))
-
-
-def render_background(canvas: Image.Image, theme_key: str, accent=(59, 130, 246)):
-    W, H = canvas.size
-    t = THEMES.get(theme_key, THEMES["pro-modern"])
-    bg = t["bg"]
-    # Solid / known tokens first
-    if isinstance(bg, tuple):
-        canvas.paste(bg, [0, 0, W, H])
-    elif bg == "gradient":
-        grad = Image.new("RGB", (W, H), (0, 0, 0))
-        p = grad.load()
-        for y in range(H):
-            for x in range(W):
-                u = x / W; v = y / H
-                r = int((1 - u) * 14 + u * 139)
-                g = int((1 - u) * 165 + u * 92)
-                b = int((1 - u) * 233 + u * 246)
-                r = min(255, int(r * (0.85 + 0.3 * v)))
-                g = min(255, int(g * (0.85 + 0.3 * v)))
-                b = min(255, int(b * (0.85 + 0.3 * v)))
-                p[x, y] = (r, g, b)
-        canvas.paste(grad)
-    elif bg == "stripe":
-        base = Image.new("RGB", (W, H), (255, 255, 255))
-        stripe = Image.new("RGB", (W * 2, H * 2), (229, 236, 255))
-        for yy in range(0, H * 2, 20):
-            ImageDraw.Draw(stripe).rectangle([0, yy, W * 2, yy + 10], fill=(229, 236, 255))
-        stripe = stripe.rotate(45, expand=True).crop((W // 2, H // 2, W // 2 + W, H // 2 + H))
-        base = Image.blend(base, stripe, 0.45)
-        canvas.paste(base)
-    elif bg == "aurora":
-        # multi-stop soft blobs sweeping diagonally
-        base = Image.new("RGB", (W, H), (7, 10, 16))
-        overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        d = ImageDraw.Draw(overlay)
-        def blob(cx, cy, rx, ry, color, alpha):
-            for i in range(6, 0, -1):
-                a = int(alpha * (i / 6) ** 2)
-                d.ellipse([cx - rx * i, cy - ry * i, cx + rx * i, cy + ry * i], fill=color + (a,))
-        blob(int(W*0.2), int(H*0.3), int(W*0.06), int(H*0.04), (14,165,233), 120)
-        blob(int(W*0.7), int(H*0.2), int(W*0.08), int(H*0.06), (139,92,246), 110)
-        blob(int(W*0.6), int(H*0.75), int(W*0.07), int(H*0.05), (20,184,166), 100)
-        overlay = overlay.filter(ImageFilter.GaussianBlur(radius=max(8, int(min(W,H)*0.01))))
-        base = base.convert("RGBA")
-        base.alpha_composite(overlay)
-        canvas.paste(base.convert("RGB"))
-    elif bg == "carbon":
-        base = Image.new("RGB", (W, H), (18, 19, 23))
-        tex = Image.new("RGB", (W, H), (18, 19, 23))
-        d = ImageDraw.Draw(tex)
-        step = 8
-        for y in range(0, H + step, step):
-            for x in range(0, W + step, step):
-                c = (24, 26, 32) if (x//step + y//step) % 2 == 0 else (20, 22, 27)
-                d.rectangle([x, y, x + step, y + step], fill=c)
-        tex = tex.filter(ImageFilter.GaussianBlur(0.6))
-        canvas.paste(Image.blend(base, tex, 0.35))
-    elif bg == "lines":
-        base = Image.new("RGB", (W, H), (245, 246, 248))
-        d = ImageDraw.Draw(base)
-        gap = max(12, W // 60)
-        for i in range(-H, W, gap):
-            d.line([(i, 0), (i + H, H)], fill=(220, 226, 234), width=1)
-        canvas.paste(base)
-    elif bg == "satin":
-        grad = Image.new("RGB", (W, H), (0, 0, 0))
-        p = grad.load()
-        for y in range(H):
-          for x in range(W):
-            u = x / W; v = y / H
-            r = int(255 * (0.92 - 0.22 * v + 0.08 * u))
-            g = int(255 * (0.95 - 0.18 * u))
-            b = int(255 * (0.98 - 0.28 * u - 0.05 * v))
-            p[x, y] = (max(210, min(255, r)), max(210, min(255, g)), max(210, min(255, b)))
-        canvas.paste(grad)
-
-    # Optional glass panel
-    if t["panel"] == "glass":
-        panel = _draw_rounded_panel(canvas)
-        canvas.alpha_composite(panel)
-    elif isinstance(t["panel"], tuple):
-        W, H = canvas.size
-        d = ImageDraw.Draw(canvas)
+def _clip(box, origin, canvas_size):
+    """Irisan `box` (koordinat kartu) dengan area canvas yang sedang dirender; None jika kosong."""
+    x0, y0, x1, y1 = box
+    ox, oy = origin
+    cw, ch = canvas_size
+    ix0, iy0 = max(x0, ox), max(y0, oy)
+    ix1, iy1 = min(x1, ox + cw), min(y1, oy + ch)
+    if ix0 >= ix1 or iy0 >= iy1:
+        return None
+    return ix0, iy0, ix1, iy1
+
+
+def _margin_box(origin, canvas_size, size, margin):
+    """Area canvas diperlebar `margin` px (dibatasi tepi kartu) supaya blur per strip identik dengan blur penuh."""
+    ox, oy = origin
+    cw, ch = canvas_size
+    W, H = size
+    return max(0, ox - margin), max(0, oy - margin), min(W, ox + cw + margin), min(H, oy + ch + margin)
+
+
+def _stripe_polygon(W, H):
+    """
+    Area terang tema stripe dalam koordinat kartu.
+    Dulu dibuat dengan memutar gambar 2W x 2H (expand) lalu crop; geometrinya sama, tanpa buffer raksasa.
+    """
+    w, h = W * 2, H * 2
+    ang = -math.radians(45)
+    a, b = math.cos(ang), math.sin(ang)
+    c, f = a * (-w / 2.0) + b * (-h / 2.0) + w / 2.0, -b * (-w / 2.0) + a * (-h / 2.0) + h / 2.0
+    xs, ys = zip(*[(a * x + b * y + c, -b * x + a * y + f) for x, y in ((0, 0), (w, 0), (w, h), (0, h))])
+    nw = math.ceil(max(xs)) - math.floor(min(xs))
+    nh = math.ceil(max(ys)) - math.floor(min(ys))
+    dx, dy = -(nw - w) / 2.0, -(nh - h) / 2.0
+    c, f = a * dx + b * dy + c, -b * dx + a * dy + f
+    pts = []
+    for x, y in ((0, 0), (w, 0), (w, h), (0, h)):
+        px, py = x - c, y - f
+        pts.append((a * px - b * py - W // 2, b * px + a * py - H // 2))
+    return pts
+
+
+def _glass_regions(W, H, radius, margin):
+    """
+    Partisi panel kaca (koordinat kartu): pita tepi yang berubah oleh blur (atas/bawah termasuk sudut,
+    kiri/kanan selebar outline) + interior yang tetap rata setelah blur.
+    """
+    pad, corner = int(W * 0.04), max(radius, 2) + 1
+    x0, y0, x1, y1 = pad, pad, W - pad, H - pad
+    top_end = y0 + corner + margin
+    bottom = max(top_end, y1 - corner - margin + 1)
+    left_end = x0 + 3 + margin
+    right = max(left_end, x1 - 2 - margin)
+    bands = [(x0 - margin, y0 - margin, x1 + 1 + margin, top_end),
+             (x0 - margin, bottom, x1 + 1 + margin, y1 + 1 + margin),
+             (x0 - margin, top_end, left_end, bottom),
+             (right, top_end, x1 + 1 + margin, bottom)]
+    return (x0, y0, x1, y1), bands, (left_end, top_end, right, bottom)
+
+
+@render_memo(maxsize=32)
+def _overlay_lut(fill, alpha):
+    """
+    LUT `point` untuk composite warna rata (fill, alpha) di atas canvas opak: per kanal hanya bergantung
+    pada nilai lama, jadi tabelnya diambil dari alpha_composite pada ramp 0..255 (hasil identik, jauh lebih murah).
+    """
+    ramp = Image.merge("RGBA", [Image.linear_gradient("L").crop((0, 0, 1, 256))] * 3 + [Image.new("L", (1, 256), 255)])
+    ramp.alpha_composite(Image.new("RGBA", ramp.size, fill + (alpha,)))
+    return [v for band in ramp.split() for v in band.tobytes()]
+
+
+def _draw_rounded_panel(canvas: Image.Image, fill=(255, 255, 255), alpha=55, outline_alpha=75, radius_factor=0.02, blur=0.5, origin=(0, 0), size=None):
+    """
+    Panel kaca: rounded rectangle semi transparan dengan tepi sedikit di-blur, langsung di-composite ke canvas.
+    Blur hanya mengubah pita selebar `margin` di sekitar garis tepi, jadi hanya pita itu yang digambar di layer
+    kecil & difilter (konteksnya dibatasi tepi kartu seperti blur penuh); interior cukup satu composite warna rata.
+    """
+    W, H = size or canvas.size
+    ox, oy = origin
+    margin = int(blur * 3) + 2 if blur > 0 else 0
+    radius = int(W * radius_factor)
+    rect, bands, interior = _glass_regions(W, H, radius, margin)
+    box = _clip(interior, origin, canvas.size)
+    if box:
+        box = (box[0] - ox, box[1] - oy, box[2] - ox, box[3] - oy)
+        canvas.paste(canvas.crop(box).point(_overlay_lut(tuple(fill), alpha)), box[:2])
+    for band in bands:
+        box = _clip(band, origin, canvas.size)
+        if box is None:
+            continue
+        cx0, cy0, cx1, cy1 = max(0, box[0] - margin), max(0, box[1] - margin), min(W, box[2] + margin), min(H, box[3] + margin)
+        layer = Image.new("RGBA", (cx1 - cx0, cy1 - cy0), tuple(fill) + (0,))
+        ImageDraw.Draw(layer).rounded_rectangle([rect[0] - cx0, rect[1] - cy0, rect[2] - cx0, rect[3] - cy0], radius=radius,
+                                                fill=tuple(fill) + (alpha,), outline=tuple(fill) + (outline_alpha,), width=2)
+        if blur > 0:
+            layer = layer.filter(ImageFilter.GaussianBlur(blur))
+        piece = layer.crop((box[0] - cx0, box[1] - cy0, box[2] - cx0, box[3] - cy0))
+        canvas.alpha_composite(piece, (box[0] - ox, box[1] - oy))
+
+
+def _bg_cache_get(key):
+    with _bg_cache_lock:
+        img = _bg_cache.get(key)
+        if img is not None:
+            _bg_cache.move_to_end(key)
+        return img
+
+
+def _bg_cache_put(key, img: Image.Image):
+    global _bg_cache_bytes
+    nbytes = img.width * img.height * len(img.getbands())
+    with _bg_cache_lock:
+        if key in _bg_cache:
+            return
+        _bg_cache[key] = img
+        _bg_cache_bytes += nbytes
+        while _bg_cache_bytes > BG_CACHE_MB * 1024 * 1024 and len(_bg_cache) > 1:
+            _, old = _bg_cache.popitem(last=False)
+            _bg_cache_bytes -= old.width * old.height * len(old.getbands())
+
+
+# ====== Theme plans ======
+# Spec tema di THEMES divalidasi lalu dikompilasi sekali menjadi RenderPlan: daftar fungsi pelukis dengan
+# parameter yang sudah dihitung. Fill/gradient dikerjakan per kanal oleh ImageMath & paste (tanpa loop
+# piksel Python), pola berulang memakai tile yang di-cache, jadi tema baru otomatis cepat.
+
+def _is_rgb(v):
+    return isinstance(v, tuple) and len(v) == 3 and all(isinstance(c, int) and 0 <= c <= 255 for c in v)
+
+
+def _is_num(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_pair(v):
+    return isinstance(v, tuple) and len(v) == 2 and all(map(_is_num, v))
+
+
+def _is_blob(b):
+    return (isinstance(b, dict) and _is_pair(b.get("at")) and _is_pair(b.get("radius"))
+            and _is_rgb(b.get("color")) and isinstance(b.get("alpha"), int) and 0 <= b["alpha"] <= 255)
+
+
+_FIELD_CHECKS = {
+    "rgb": _is_rgb,
+    "rgb2": lambda v: isinstance(v, tuple) and len(v) == 2 and all(map(_is_rgb, v)),
+    "vec3": lambda v: isinstance(v, tuple) and len(v) == 3 and all(map(_is_num, v)),
+    "range": lambda v: _is_pair(v) and v[0] <= v[1],
+    "number": lambda v: _is_num(v) and v >= 0,
+    "count": lambda v: isinstance(v, int) and not isinstance(v, bool) and v > 0,
+    "blobs": lambda v: isinstance(v, list) and bool(v) and all(map(_is_blob, v)),
+}
+
+# field wajib per tipe layer -> jenis nilai; glass punya field opsional (default di GLASS_DEFAULTS)
+LAYER_FIELDS = {
+    "fill": {"color": "rgb"},
+    "gradient": {"from": "rgb", "to": "rgb", "shade": "range"},
+    "sheen": {"base": "vec3", "du": "vec3", "dv": "vec3", "clamp": "range"},
+    "stripe": {"base": "rgb", "color": "rgb"},
+    "blobs": {"blobs": "blobs", "blur": "number", "min_blur": "count"},
+    "checker": {"step": "count", "colors": "rgb2", "base": "rgb", "blur": "number", "opacity": "number"},
+    "lines": {"density": "count", "min_gap": "count", "color": "rgb"},
+    "panel": {"color": "rgb"},
+    "glass": {},
+}
+GLASS_DEFAULTS = {"alpha": 55, "outline_alpha": 75, "blur": 0.5}
+BASE_LAYERS = ("fill", "gradient", "sheen", "stripe", "checker")  # layer yang menutup seluruh kartu
+PANEL_LAYERS = ("panel", "glass")
+
+
+def validate_theme(key: str, spec: dict):
+    """Raise ValueError dengan pesan jelas bila spec tema tidak valid."""
+    def fail(msg):
+        raise ValueError(f"Tema {key!r}: {msg}")
+
+    for name in ("title", "fg", "sub", "dark", "layers"):
+        if name not in spec:
+            fail(f"field {name!r} wajib ada")
+    if not _is_rgb(spec["fg"]) or not _is_rgb(spec["sub"]):
+        fail("fg/sub harus tuple RGB (0-255)")
+    if not isinstance(spec["dark"], bool):
+        fail("dark harus bool")
+    layers = spec["layers"]
+    if not isinstance(layers, list) or not layers:
+        fail("layers harus list berisi minimal satu layer")
+    if layers[0].get("type") not in BASE_LAYERS:
+        fail(f"layer pertama harus layer dasar {BASE_LAYERS}")
+    if sum(1 for layer in layers if layer.get("type") in PANEL_LAYERS) > 1:
+        fail("maksimal satu layer panel/glass")
+    for i, layer in enumerate(layers):
+        kind = layer.get("type")
+        if kind not in LAYER_FIELDS:
+            fail(f"layer #{i}: tipe {kind!r} tidak dikenal")
+        fields = LAYER_FIELDS[kind]
+        optional = GLASS_DEFAULTS if kind == "glass" else {}
+        for name, check in fields.items():
+            if not _FIELD_CHECKS[check](layer.get(name)):
+                fail(f"layer #{i} ({kind}): field {name!r} tidak valid")
+        for name in optional:
+            if name in layer and not _is_num(layer[name]):
+                fail(f"layer #{i} ({kind}): field {name!r} harus angka")
+        extra = set(layer) - set(fields) - set(optional) - {"type"}
+        if extra:
+            fail(f"layer #{i} ({kind}): field tidak dikenal {sorted(extra)}")
+
+
+def _axis_image(values, horizontal: bool, size) -> Image.Image:
+    """Image 'F' seukuran `size` yang nilainya hanya bergantung pada x (horizontal) atau y."""
+    data = array("f", values).tobytes()
+    src = Image.frombytes("F", (len(values), 1) if horizontal else (1, len(values)), data)
+    return src.resize(size, Image.NEAREST)
+
+
+def _tile_into(canvas: Image.Image, tile: Image.Image, origin, mask_color=None):
+    """
+    Isi canvas dengan `tile` berulang; fase mengikuti koordinat kartu sehingga strip tetap menyambung.
+    Dengan `mask_color`, tile ('L') dipakai sebagai mask untuk warna tsb di atas isi canvas.
+    """
+    cw, ch = canvas.size
+    tw, th = tile.size
+    ox, oy = origin
+    row = Image.new(tile.mode, (cw + tw, th))
+    for x in range(0, cw + tw, tw):
+        row.paste(tile, (x, 0))
+    row = row.crop((ox % tw, 0, ox % tw + cw, th))
+    band = Image.new(tile.mode, (cw, ch + th))
+    for y in range(0, ch + th, th):
+        band.paste(row, (0, y))
+    band = band.crop((0, oy % th, cw, oy % th + ch))
+    if mask_color is None:
+        canvas.paste(band)
+    else:
+        canvas.paste(mask_color, (0, 0, cw, ch), band)
+
+
+@render_memo(maxsize=32)
+def _checker_tile(step, colors, base, blur, opacity) -> Image.Image:
+    """Satu periode (2*step) tekstur checker yang sudah di-blur & di-blend dengan warna dasar."""
+    p = step * 2
+    mosaic = Image.new("RGB", (p * 3, p * 3))
+    d = ImageDraw.Draw(mosaic)
+    for y in range(0, p * 3, step):
+        for x in range(0, p * 3, step):
+            d.rectangle([x, y, x + step - 1, y + step - 1], fill=colors[(x // step + y // step) % 2])
+    # blur di mosaic 3x3 lalu ambil tile tengah -> blur periodik tanpa efek tepi
+    mosaic = mosaic.filter(ImageFilter.GaussianBlur(blur)).crop((p, p, p * 2, p * 2))
+    return Image.blend(Image.new("RGB", (p, p), base), mosaic, opacity)
+
+
+@render_memo(maxsize=64)
+def _lines_tile(gap, phase) -> Image.Image:
+    """Mask satu periode garis diagonal: piksel (x, y) kena garis bila (x - y + phase) % gap == 0."""
+    tile = Image.new("L", (gap, gap), 0)
+    for ty in range(gap):
+        tile.putpixel(((ty - phase) % gap, ty), 255)
+    return tile
+
+
+def _fill_painter(layer):
+    color = layer["color"]
+
+    def paint(canvas, origin, size, pool):
+        canvas.paste(color, (0, 0, canvas.width, canvas.height))
+    return paint
+
+
+def _gradient_painter(layer):
+    c0, c1 = layer["from"], layer["to"]
+    lo, hi = layer["shade"]
+
+    def paint(canvas, origin, size, pool):
+        (cw, ch), (ox, oy), (W, H) = canvas.size, origin, size
+        us = [(x + ox) / W for x in range(cw)]
+        shade = _axis_image([lo + (hi - lo) * (y + oy) / H for y in range(ch)], False, canvas.size)
+        bands = []
+        for i in range(3):
+            ramp = _axis_image([int((1 - u) * c0[i] + u * c1[i]) for u in us], True, canvas.size)
+            bands.append(ImageMath.lambda_eval(lambda e: e["convert"](e["min"](e["r"] * e["s"], 255), "L"), r=ramp, s=shade))
+        canvas.paste(Image.merge("RGB", bands))
+    return paint
+
+
+def _sheen_painter(layer):
+    base, du, dv = layer["base"], layer["du"], layer["dv"]
+    lo, hi = layer["clamp"]
+
+    def paint(canvas, origin, size, pool):
+        (cw, ch), (ox, oy), (W, H) = canvas.size, origin, size
+        bands = []
+        for i in range(3):
+            a = _axis_image([255 * (base[i] + du[i] * (x + ox) / W) for x in range(cw)], True, canvas.size)
+            b = _axis_image([255 * dv[i] * (y + oy) / H for y in range(ch)], False, canvas.size)
+            bands.append(ImageMath.lambda_eval(lambda e: e["convert"](e["max"](e["min"](e["a"] + e["b"], hi), lo), "L"), a=a, b=b))
+        canvas.paste(Image.merge("RGB", bands))
+    return paint
+
+
+def _stripe_painter(layer):
+    base, color = layer["base"], layer["color"]
+
+    def paint(canvas, origin, size, pool):
+        (ox, oy), (W, H) = origin, size
+        canvas.paste(base, (0, 0, canvas.width, canvas.height))
+        ImageDraw.Draw(canvas).polygon([(x - ox, y - oy) for x, y in _stripe_polygon(W, H)], fill=color)
+    return paint
+
+
+def _blur_scale(radius: int, min_radius=None) -> int:
+    """Faktor downsample (pangkat dua) untuk blur `radius`; pangkat dua membuat koordinat strip tetap eksak."""
+    min_radius = BLUR_MIN_RADIUS if min_radius is None else min_radius
+    f = 1
+    while min_radius > 0 and radius >= min_radius * f * 2:
+        f *= 2
+    return f
+
+
+def _draw_blobs(d, blobs, W, H, shift=(0, 0)):
+    sx, sy = shift
+    for b in blobs:
+        cx, cy = int(W * b["at"][0]) - sx, int(H * b["at"][1]) - sy
+        rx, ry = int(W * b["radius"][0]), int(H * b["radius"][1])
+        for i in range(6, 0, -1):
+            a = int(b["alpha"] * (i / 6) ** 2)
+            d.ellipse([cx - rx * i, cy - ry * i, cx + rx * i, cy + ry * i], fill=b["color"] + (a,))
+
+
+def _blobs_painter(layer):
+    blobs, k, min_blur = layer["blobs"], layer["blur"], layer["min_blur"]
+    min_radius = 2 if layer.get("draft") else None
+
+    @render_memo(maxsize=8)
+    def glow(W, H, f):
+        """
+        Glow seluruh kartu pada resolusi 1/f, di-blur di sana; kecil, jadi dipakai bersama semua strip.
+        Elips digambar resolusi penuh per band lalu di-reduce (tepi cincin tetap halus, memori tetap kecil).
+        """
+        radius = max(min_blur, int(min(W, H) * k))
+        low = Image.new("RGBA", (-(-W // f), -(-H // f)), (0, 0, 0, 0))
+        step = f * 64
+        for y0 in range(0, H, step):
+            band = Image.new("RGBA", (W, min(step, H - y0)), (0, 0, 0, 0))
+            _draw_blobs(ImageDraw.Draw(band), blobs, W, H, shift=(0, y0))
+            low.paste(band.reduce(f), (0, y0 // f))
+        return low.filter(ImageFilter.GaussianBlur(radius=radius / f))
+
+    def paint(canvas, origin, size, pool):
+        (cw, ch), (ox, oy), (W, H) = canvas.size, origin, size
+        radius = max(min_blur, int(min(W, H) * k))
+        f = _blur_scale(radius, min_radius)
+        if f > 1:
+            # upscale hanya bagian milik canvas ini; box kelipatan 1/2^n -> strip identik dengan render penuh
+            box = (ox / f, oy / f, (ox + cw) / f, (oy + ch) / f)
+            canvas.alpha_composite(glow(W, H, f).resize((cw, ch), Image.BILINEAR, box=box))
+            return
+        left, top, right, bottom = _margin_box(origin, canvas.size, size, radius * 3)
+        overlay = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        _draw_blobs(ImageDraw.Draw(overlay), blobs, W, H, shift=(left, top))
+        overlay = _filter_bands(overlay, ImageFilter.GaussianBlur(radius=radius), radius * 3, pool)
+        canvas.alpha_composite(overlay.crop((ox - left, oy - top, ox - left + cw, oy - top + ch)))
+    return paint
+
+
+def _checker_painter(layer):
+    args = (layer["step"], layer["colors"], layer["base"], layer["blur"], layer["opacity"])
+
+    def paint(canvas, origin, size, pool):
+        _tile_into(canvas, _checker_tile(*args), origin)
+    return paint
+
+
+def _lines_painter(layer):
+    density, min_gap, color = layer["density"], layer["min_gap"], layer["color"]
+
+    def paint(canvas, origin, size, pool):
+        W, H = size
+        gap = max(min_gap, W // density)
+        _tile_into(canvas, _lines_tile(gap, H % gap), origin, mask_color=color)
+    return paint
+
+
+def _panel_painter(layer):
+    color = layer["color"]
+
+    def paint(canvas, origin, size, pool):
+        (ox, oy), (W, H) = origin, size
         pad = int(W * 0.04)
-        d.rounded_rectangle([pad, pad, W - pad, H - pad], radius=int(W * 0.02), fill=t["panel"])
+        ImageDraw.Draw(canvas).rounded_rectangle([pad - ox, pad - oy, W - pad - ox, H - pad - oy], radius=int(W * 0.02), fill=color)
+    return paint
 
 
-def render_card(payload: dict) -> Image.Image:
+def _glass_painter(layer):
+    opts = {k: layer.get(k, v) for k, v in GLASS_DEFAULTS.items()}
+
+    def paint(canvas, origin, size, pool):
+        _draw_rounded_panel(canvas, origin=origin, size=size, **opts)
+    return paint
+
+
+LAYER_PAINTERS = {
+    "fill": _fill_painter, "gradient": _gradient_painter, "sheen": _sheen_painter, "stripe": _stripe_painter,
+    "blobs": _blobs_painter, "checker": _checker_painter, "lines": _lines_painter,
+    "panel": _panel_painter, "glass": _glass_painter,
+}
+
+
+class RenderPlan:
+    """Tema yang sudah dikompilasi: urutan pelukis layer + flag yang dipakai layout dan thumbnail."""
+
+    __slots__ = ("key", "title", "fg", "sub", "dark", "glass", "textured", "swatch", "painters", "fingerprint", "draft")
+
+    def __init__(self, key: str, spec: dict, draft=False):
+        kinds = [layer["type"] for layer in spec["layers"]]
+        self.key = key
+        self.draft = draft
+        self.title = spec["title"]
+        self.fg = spec["fg"]
+        self.sub = spec["sub"]
+        self.dark = spec["dark"]
+        self.glass = "glass" in kinds
+        # fill + panel solid sudah murah; selain itu background layak di-cache
+        self.textured = any(k not in ("fill", "panel") for k in kinds)
+        if any(k in ("gradient", "sheen", "blobs") for k in kinds):
+            self.swatch = "url(#g)"
+        elif any(k in ("stripe", "lines", "checker") for k in kinds):
+            self.swatch = "url(#p)"
+        else:
+            self.swatch = "rgb({},{},{})".format(*spec["layers"][0]["color"])
+        self.painters = tuple(LAYER_PAINTERS[layer["type"]](layer) for layer in spec["layers"])
+        # identitas isi spec: key cache di disk ikut berubah bila tema diedit
+        self.fingerprint = hashlib.sha256(repr(sorted(spec.items())).encode()).hexdigest()[:16]
+
+    def paint(self, canvas: Image.Image, origin=(0, 0), size=None, pool=None):
+        size = size or canvas.size
+        for paint in self.painters:
+            paint(canvas, origin, size, pool)
+
+
+def _draft_layer(layer: dict) -> dict:
+    """Versi murah layer untuk preview saat server sibuk: panel kaca tanpa blur, glow di resolusi serendah mungkin."""
+    if layer["type"] == "glass":
+        return dict(layer, blur=0)
+    if layer["type"] == "blobs":
+        return dict(layer, draft=True)
+    return layer
+
+
+def compile_theme(key: str, spec: dict, draft=False) -> RenderPlan:
+    validate_theme(key, spec)
+    if draft:
+        spec = dict(spec, layers=[_draft_layer(layer) for layer in spec["layers"]])
+    return RenderPlan(key, spec, draft)
+
+
+THEME_PLANS = {k: compile_theme(k, v) for k, v in THEMES.items()}
+DRAFT_PLANS = {}
+
+
+def theme_plan(theme_key: str, draft=False) -> RenderPlan:
+    """RenderPlan untuk tema; tema yang ditambahkan ke THEMES belakangan (dan versi draft) dikompilasi saat pertama dipakai."""
+    plans = DRAFT_PLANS if draft else THEME_PLANS
+    plan = plans.get(theme_key)
+    if plan is None:
+        if theme_key not in THEMES:
+            return theme_plan("pro-modern", draft)
+        plan = plans[theme_key] = compile_theme(theme_key, THEMES[theme_key], draft)
+    return plan
+
+
+@traced("background")
+def render_background(canvas: Image.Image, theme_key: str, accent=(59, 130, 246), origin=(0, 0), size=None, pool=None, draft=False):
     """
-    Render kartu menggunakan tema & layout profesional.
+    Gambar background tema ke `canvas`.
+    `canvas` boleh hanya potongan kartu (strip) berukuran `size` yang dimulai di `origin`.
+    Dengan `pool`, blur yang berat dikerjakan per band secara paralel; `draft` memakai plan murah (preview sibuk).
+    Background kartu utuh berukuran wajar diambil dari cache per (tema, ukuran): memori proses dulu,
+    lalu cache aset di disk yang dipakai bersama worker lain.
     """
+    W, H = size or canvas.size
+    plan = theme_plan(theme_key, draft)
+    if plan.textured and origin == (0, 0) and canvas.size == (W, H) and W * H <= BG_CACHE_MAX_PIXELS:
+        key = (plan.key, W, H) + (("draft",) if plan.draft else ())
+        cached = _bg_cache_get(key)
+        if cached is None:
+            # BLUR_MIN_RADIUS mengubah piksel glow/kaca tapi bukan bagian spec tema: ikut di key disk
+            disk_key = ("bg", plan.fingerprint, BLUR_MIN_RADIUS, W, H)
+            cached = asset_cache.get_image(disk_key)
+            if cached is None:
+                cached = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+                plan.paint(cached, (0, 0), (W, H), pool)
+                asset_cache.put_image(disk_key, cached)
+            _bg_cache_put(key, cached)
+        canvas.paste(cached)
+        return
+    plan.paint(canvas, origin, (W, H), pool)
+
+
+def card_size(payload: dict):
+    """Ukuran kartu dari payload; kartu di atas MAX_CARD_PIXELS ditolak dengan pesan yang jelas."""
     W, H = parse_size(payload.get("size", "1050x600"))
+    if W * H > MAX_CARD_PIXELS:
+        raise ValueError(f"Ukuran {W}x{H} terlalu besar: maksimal {MAX_CARD_PIXELS:,} piksel per kartu.")
+    return W, H
+
+
+def payload_quality(payload: dict) -> dict:
+    """Level kualitas render payload (lihat QUALITY_LEVELS); hanya preview yang bisa diturunkan governor."""
+    return QUALITY.get(payload.get("quality") or "full", QUALITY_LEVELS[0])
+
+
+def is_large_format(size) -> bool:
+    return size[0] * size[1] > LARGE_FORMAT_PIXELS
+
+
+def strip_height(width: int, budget_mb=None) -> int:
+    budget = int((budget_mb or RENDER_MEMORY_MB) * 1024 * 1024)
+    return max(16, budget // (width * 4 * STRIP_BUFFERS))
+
+
+def render_pool():
+    """ThreadPoolExecutor bersama untuk render; None bila CARD_RENDER_THREADS <= 1."""
+    global _render_pool
+    if RENDER_THREADS <= 1:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=RENDER_THREADS, thread_name_prefix="card-render")
+    return _render_pool
+
+
+def use_parallel(payload: dict, size) -> bool:
+    flag = payload.get("parallel")
+    if flag is None or flag == "":
+        return size[0] * size[1] >= PARALLEL_MIN_PIXELS
+    if isinstance(flag, str):
+        return flag.lower() in ("1", "true", "yes", "on")
+    return bool(flag)
+
+
+def _resolved(value):
+    return value.result() if isinstance(value, Future) else value
+
+
+def _filter_bands(img: Image.Image, filt, margin: int, pool=None) -> Image.Image:
+    """
+    `img.filter(filt)` dipecah per band horizontal dan dikerjakan paralel di `pool`.
+    Tiap band diberi `margin` baris tetangga supaya hasilnya identik dengan filter penuh.
+    Task di pool tidak pernah menunggu task lain, jadi aman dipanggil dari banyak request sekaligus.
+    """
+    W, H = img.size
+    if pool is None or H < margin * 4:
+        return img.filter(filt)
+    step = max(margin * 2, -(-H // RENDER_THREADS))
+
+    def work(y0):
+        y1 = min(H, y0 + step)
+        top, bottom = max(0, y0 - margin), min(H, y1 + margin)
+        return y0, img.crop((0, top, W, bottom)).filter(filt).crop((0, y0 - top, W, y1 - top))
+
+    out = Image.new(img.mode, img.size)
+    for y0, band in pool.map(work, range(0, H, step)):
+        out.paste(band, (0, y0))
+    return out
+
+
+def _load_logo(img: Image.Image, size, resample=Image.LANCZOS):
+    # decode penuh baru terjadi di sini (Image.open hanya membaca header)
+    try:
+        return img.convert("RGBA").resize(size, resample)
+    except Exception:
+        return None
+
+
+@traced("layout")
+def layout_card(payload: dict, size, pool=None) -> dict:
+    """
+    Hitung layout kartu (font, posisi teks, logo, QR) sekali.
+    Hasilnya dipakai `paint_card` untuk kartu penuh maupun per strip.
+    Dengan `pool`, decode/resize logo dan encode QR jalan di thread lain (disimpan sebagai Future).
+    """
+    W, H = size
     theme_key = payload.get("theme", "pro-modern")
     accent = parse_color(payload.get("accent", "#3b82f6"))
     url = (payload.get("url") or "").strip()
+    quality = payload_quality(payload)
 
-    t = THEMES.get(theme_key, THEMES["pro-modern"])
-    fg = t["fg"]; sub = t["sub"]
-    panel_color = t["panel"] if isinstance(t["panel"], tuple) else None
-
-    card = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-    render_background(card, theme_key, accent=accent)
-    draw = ImageDraw.Draw(card)
-
-    if panel_color:
-        pad = int(W * 0.04)
-        draw.rounded_rectangle([pad, pad, W - pad, H - pad], radius=int(W * 0.02), fill=panel_color)
+    t = theme_plan(theme_key)
+    fg = t.fg; sub = t.sub
+    # textbbox tidak bergantung isi gambar, cukup canvas 1x1 untuk mengukur
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
 
     pad = int(W * 0.06)
     inner_w = W - pad * 2
     inner_h = H - pad * 2
-    left_x = pad + (int(W * 0.02) if t["panel"] in ["glass"] else 0)
+    left_x = pad + (int(W * 0.02) if t.glass else 0)
     right_w = int(inner_w * 0.38)
     left_w = inner_w - right_w - int(W * 0.02)
 
+    layout = {
+        "size": (W, H), "theme_key": theme_key, "theme": t, "accent": accent,
+        "logo": None, "texts": [], "qr": None, "draft": quality["draft"],
+    }
+
     logo_img = None
     if payload.get("logo"):
         try:
-            logo_img = Image.open(payload["logo"]).convert("RGBA")
+            # cukup header dulu; ukuran logo sudah menentukan layout teks
+            logo_img = Image.open(payload["logo"])
         except Exception:
             logo_img = None
 
@@ -859,19 +2130,27 @@ def render_card(payload: dict) -> Image.Image:
     phone = payload.get("phone", "").strip()
     address = payload.get("address", "").strip()
 
+    def text(xy, s, font, role):
+        # role (fg/sub) disimpan supaya layout bisa diwarnai ulang untuk tema lain (lihat retheme_layout)
+        fill = fg if role == "fg" else sub
+        layout["texts"].append((xy, s, font, fill, draw.textbbox(xy, s, font=font), role))
+
     y = pad + int(H * 0.02)
 
     if logo_img:
         max_lw = int(left_w * 0.35)
         max_lh = int(H * 0.22)
-        logo_img = fit_logo(logo_img, max_lw, max_lh)
-        card.alpha_composite(logo_img, dest=(left_x, y))
-        y += logo_img.height + int(H * 0.03)
+        lsize = logo_size(logo_img.size, max_lw, max_lh)
+        if pool:
+            layout["logo"] = (pool.submit(_load_logo, logo_img, lsize, quality["resample"]), (left_x, y))
+        else:
+            layout["logo"] = (_load_logo(logo_img, lsize, quality["resample"]), (left_x, y))
+        y += lsize[1] + int(H * 0.03)
 
     # Name (auto-fit)
     name_max = int(left_w * 0.98)
     name_font, name_size = fit_text(draw, name or "Nama Kamu", name_max, max_size=int(H * 0.16), min_size=int(H * 0.09), weight="bold")
-    draw.text((left_x, y), name or "Nama Kamu", font=name_font, fill=fg)
+    text((left_x, y), name or "Nama Kamu", name_font, "fg")
     y += int(name_size * 1.25)
 
     # Title + Company
@@ -880,60 +2159,826 @@ def render_card(payload: dict) -> Image.Image:
     w = draw.textbbox((0, 0), tc_line or "Perusahaan", font=tfont)[2]
     text_to_draw = tc_line or "Perusahaan"
     if w <= name_max:
-        draw.text((left_x, y), text_to_draw, font=tfont, fill=sub)
+        text((left_x, y), text_to_draw, tfont, "sub")
         y += int(tfont.size * 1.5)
     else:
         base = load_font(int(H * 0.07), "semibold")
         lines = wrap_text(draw, text_to_draw, base, name_max)[:2]
         for ln in lines:
-            draw.text((left_x, y), ln, font=base, fill=sub)
+            text((left_x, y), ln, base, "sub")
             y += int(base.size * 1.35)
 
     # Contacts
     info_font = load_font(int(H * 0.06), "regular")
     contacts = [x for x in [email, phone] if x]
     for line in contacts:
-        draw.text((left_x, y), line, font=info_font, fill=fg)
+        text((left_x, y), line, info_font, "fg")
         y += int(info_font.size * 1.35)
 
     if address:
         small = load_font(int(H * 0.055), "regular")
         for ln in wrap_text(draw, address, small, name_max)[:3]:
-            draw.text((left_x, y), ln, font=small, fill=fg)
+            text((left_x, y), ln, small, "fg")
             y += int(small.size * 1.35)
 
     # QR with safe white frame on dark backgrounds
     if url:
         qr_size = min(int(H * 0.72), int(inner_w * 0.38))
-        dark_bg = theme_key in ["pro-dark", "pro-glass", "pro-gradient", "pro-aurora", "pro-carbon"]
+        dark_bg = t.dark
         back = (255, 255, 255)
-        qr_img = make_qr(url, fill=accent, back=back, box_size=max(4, qr_size // 60))
-        qr_img = qr_img.resize((qr_size, qr_size), Image.NEAREST)
-        qr_x = W - pad - qr_size
-        qr_y = pad + (inner_h - qr_size) // 2
-        if dark_bg:
-            frame_pad = int(qr_size * 0.08)
-            frame = Image.new("RGBA", (qr_size + frame_pad * 2, qr_size + frame_pad * 2), (255, 255, 255, 28))
-            r = int(min(frame.size) * 0.12)
-            ImageDraw.Draw(frame).rounded_rectangle([0, 0, frame.size[0] - 1, frame.size[1] - 1], radius=r, fill=(255, 255, 255, 36), outline=(255, 255, 255, 60), width=2)
-            card.alpha_composite(frame, dest=(qr_x - frame_pad, qr_y - frame_pad))
-        card.alpha_composite(qr_img, dest=(qr_x, qr_y))
+        # QR disimpan di resolusi modul aslinya; diperbesar NEAREST hanya untuk area yang dilukis
+        qr_args = (url, accent, back, max(4, qr_size // 60))
+        qr_img = pool.submit(make_qr, *qr_args) if pool else make_qr(*qr_args)
+        layout["qr"] = {
+            "data": url, "box": qr_args[3],
+            "img": qr_img,
+            "size": qr_size,
+            "pos": (W - pad - qr_size, pad + (inner_h - qr_size) // 2),
+            "frame_pad": int(qr_size * 0.08) if dark_bg else 0,
+        }
 
+    return layout
+
+
+def retheme_layout(layout: dict, theme_key: str, accent) -> dict:
+    """
+    Layout yang sama untuk tema/aksen lain tanpa fitting teks, decode logo, atau encode QR ulang.
+    Geometri hanya bergeser horizontal untuk tema glass; warna teks, frame QR & warna QR ikut tema/aksen.
+    """
+    W, _ = layout["size"]
+    old, new = layout["theme"], theme_plan(theme_key)
+    dx = (int(W * 0.02) if new.glass else 0) - (int(W * 0.02) if old.glass else 0)
+    colors = {"fg": new.fg, "sub": new.sub}
+    out = dict(layout, theme_key=theme_key, theme=new, accent=accent)
+    out["texts"] = [((x + dx, y), s, font, colors[role], (b0 + dx, b1, b2 + dx, b3), role)
+                    for (x, y), s, font, _, (b0, b1, b2, b3), role in layout["texts"]]
+    if layout["logo"]:
+        img, (lx, ly) = layout["logo"]
+        out["logo"] = (img, (lx + dx, ly))
+    if layout["qr"]:
+        qr = layout["qr"]
+        out["qr"] = dict(qr, img=make_qr(qr["data"], accent, (255, 255, 255), qr["box"]),
+                         frame_pad=int(qr["size"] * 0.08) if new.dark else 0)
+    return out
+
+
+def _paint_qr(canvas: Image.Image, qr: dict, origin):
+    ox, oy = origin
+    qr_size = qr["size"]
+    qr_x, qr_y = qr["pos"]
+    frame_pad = qr["frame_pad"]
+    if frame_pad:
+        fs = qr_size + frame_pad * 2
+        fx, fy = qr_x - frame_pad, qr_y - frame_pad
+        area = _clip((fx, fy, fx + fs, fy + fs), origin, canvas.size)
+        if area:
+            x0, y0, x1, y1 = area
+            frame = Image.new("RGBA", (x1 - x0, y1 - y0), (255, 255, 255, 28))
+            r = int(fs * 0.12)
+            ImageDraw.Draw(frame).rounded_rectangle([fx - x0, fy - y0, fx - x0 + fs - 1, fy - y0 + fs - 1], radius=r, fill=(255, 255, 255, 36), outline=(255, 255, 255, 60), width=2)
+            canvas.alpha_composite(frame, dest=(x0 - ox, y0 - oy))
+    area = _clip((qr_x, qr_y, qr_x + qr_size, qr_y + qr_size), origin, canvas.size)
+    if area:
+        x0, y0, x1, y1 = area
+        src = _resolved(qr["img"])
+        sx, sy = src.width / qr_size, src.height / qr_size
+        box = ((x0 - qr_x) * sx, (y0 - qr_y) * sy, (x1 - qr_x) * sx, (y1 - qr_y) * sy)
+        part = src.resize((x1 - x0, y1 - y0), Image.NEAREST, box=box)
+        canvas.alpha_composite(part, dest=(x0 - ox, y0 - oy))
+
+
+def paint_card(canvas: Image.Image, layout: dict, origin=(0, 0), background=True, pool=None):
+    """Lukis kartu (atau strip kartu yang dimulai di `origin`) dari hasil `layout_card`."""
+    W, H = layout["size"]
+    ox, oy = origin
+    if background:
+        render_background(canvas, layout["theme_key"], accent=layout["accent"], origin=origin, size=(W, H), pool=pool,
+                          draft=layout["draft"])
+    with stage("compose"):
+        draw = ImageDraw.Draw(canvas)
+
+        logo_img = _resolved(layout["logo"][0]) if layout["logo"] else None
+        if logo_img:
+            lx, ly = layout["logo"][1]
+            area = _clip((lx, ly, lx + logo_img.width, ly + logo_img.height), origin, canvas.size)
+            if area:
+                x0, y0, x1, y1 = area
+                canvas.alpha_composite(logo_img, dest=(x0 - ox, y0 - oy), source=(x0 - lx, y0 - ly, x1 - lx, y1 - ly))
+
+        for (x, y), s, font, fill, bbox, _ in layout["texts"]:
+            if _clip(bbox, origin, canvas.size):
+                draw.text((x - ox, y - oy), s, font=font, fill=fill)
+
+        if layout["qr"]:
+            _paint_qr(canvas, layout["qr"], origin)
+
+
+def render_card(payload: dict) -> Image.Image:
+    """
+    Render kartu menggunakan tema & layout profesional.
+    """
+    size = card_size(payload)
+    card = Image.new("RGBA", size, (0, 0, 0, 0))
+    pool = render_pool() if use_parallel(payload, size) else None
+    if pool is None:
+        paint_card(card, layout_card(payload, size))
+        return card
+    # layout teks (+ logo/QR di dalamnya) di pool, background di thread ini; komposisi setelah keduanya siap
+    layout_f = pool.submit(layout_card, payload, size, pool)
+    render_background(card, payload.get("theme", "pro-modern"), accent=parse_color(payload.get("accent", "#3b82f6")), size=size, pool=pool,
+                      draft=payload_quality(payload)["draft"])
+    with stage("layout"):
+        layout = layout_f.result()
+    paint_card(card, layout, background=False)
     return card
 
 
-def pil_to_png_bytes(img: Image.Image) -> bytes:
+def render_card_strips(payload: dict, budget_mb=None):
+    """
+    Render kartu besar sebagai strip horizontal (generator).
+    Hanya satu strip + buffer blur-nya yang hidup bersamaan, jadi memori puncak mengikuti budget.
+    """
+    W, H = card_size(payload)
+    pool = render_pool() if use_parallel(payload, (W, H)) else None
+    layout = layout_card(payload, (W, H), pool)
+    step = strip_height(W, budget_mb)
+    for y in range(0, H, step):
+        strip = Image.new("RGBA", (W, min(step, H - y)), (0, 0, 0, 0))
+        paint_card(strip, layout, origin=(0, y), pool=pool)
+        yield strip
+
+
+@traced("encode_png")
+def write_png(img: Image.Image, fp, compress_level=6):
+    """Encode PNG langsung ke `fp` (file hasil atau BytesIO)."""
+    img.save(fp, format="PNG", compress_level=compress_level)
+
+
+def pil_to_png_bytes(img: Image.Image, compress_level=6) -> bytes:
     bio = io.BytesIO()
-    img.save(bio, format="PNG")
+    write_png(img, bio, compress_level)
     return bio.getvalue()
 
 
-def pil_to_pdf_bytes(img: Image.Image, dpi=300) -> bytes:
+def write_pdf(img: Image.Image, fp, dpi=300, color="rgb"):
+    """Encode PDF langsung ke `fp` (file hasil atau BytesIO)."""
+    if color == "cmyk":
+        # writer sendiri: Flate lossless + profil ICC (Pillow menyimpan PDF CMYK sebagai JPEG)
+        pdf = PdfStripWriter(fp, img.size, dpi=dpi, color="cmyk")
+        pdf.write(img)
+        pdf.close()
+        return
+    with stage("encode_pdf"):
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.save(fp, format="PDF", resolution=dpi)
+
+
+def pil_to_pdf_bytes(img: Image.Image, dpi=300, color="rgb") -> bytes:
     bio = io.BytesIO()
+    write_pdf(img, bio, dpi=dpi, color=color)
+    return bio.getvalue()
+
+
+# ====== Print color ======
+
+@render_memo(maxsize=8)
+def load_profile(path: str):
+    return ImageCms.createProfile("sRGB") if path in ("", "sRGB") else ImageCms.getOpenProfile(path)
+
+
+@render_memo(maxsize=16)
+def color_transform(in_profile: str, out_profile: str, intent: str):
+    """Transform RGB->CMYK yang di-cache; NOCACHE membuatnya aman dipakai banyak thread sekaligus."""
+    if intent not in RENDER_INTENTS:
+        raise ValueError(f"Rendering intent tidak dikenal: {intent}")
+    return ImageCms.buildTransform(load_profile(in_profile), load_profile(out_profile), "RGB", "CMYK",
+                                   renderingIntent=RENDER_INTENTS[intent], flags=ImageCms.Flags.NOCACHE)
+
+
+def print_transform():
+    """(transform, icc_bytes) untuk profil cetak yang dikonfigurasi, atau (None, None) bila tidak ada."""
+    if not CMYK_PROFILE:
+        return None, None
+    return color_transform(RGB_PROFILE, CMYK_PROFILE, CMYK_INTENT), load_profile(CMYK_PROFILE).tobytes()
+
+
+def pdf_color(payload: dict) -> str:
+    color = payload.get("color") or "rgb"
+    if color not in ("rgb", "cmyk"):
+        raise ValueError("Warna PDF harus rgb atau cmyk.")
+    return color
+
+
+def to_cmyk(img: Image.Image, transform=None) -> Image.Image:
     if img.mode != "RGB":
         img = img.convert("RGB")
-    img.save(bio, format="PDF", resolution=dpi)
-    return bio.getvalue()
+    return ImageCms.applyTransform(img, transform) if transform else img.convert("CMYK")
+
+
+# ====== Streaming encoders (large format) ======
+
+class PngStripWriter:
+    """Encoder PNG yang menerima baris per strip dan langsung mengalirkannya ke `fp`."""
+
+    def __init__(self, fp, size, mode="RGBA", compress_level=6):
+        self.fp = fp
+        self.width, self.height = size
+        self.mode = mode
+        self._z = zlib.compressobj(compress_level)
+        color_type = {"RGB": 2, "RGBA": 6}[mode]
+        fp.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, color_type, 0, 0, 0))
+
+    def _chunk(self, tag: bytes, data: bytes):
+        self.fp.write(struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    @traced("encode_png")
+    def write(self, strip: Image.Image):
+        if strip.mode != self.mode:
+            strip = strip.convert(self.mode)
+        raw = strip.tobytes()
+        stride = self.width * len(self.mode)
+        # filter byte 0 (None) di awal setiap baris
+        data = self._z.compress(b"".join(b"\x00" + raw[i:i + stride] for i in range(0, len(raw), stride)))
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        self._chunk(b"IDAT", self._z.flush())
+        self._chunk(b"IEND", b"")
+
+
+class PdfStripWriter:
+    """
+    PDF satu halaman berisi satu image XObject (FlateDecode) yang datanya ditulis per strip.
+    Dengan color="cmyk" tiap strip dikonversi lewat transform ICC yang di-cache, dan profil output
+    disematkan sebagai ruang warna ICCBased.
+    """
+
+    def __init__(self, fp, size, dpi=300, color="rgb"):
+        self.fp = fp
+        self.color = color
+        self._transform, icc = print_transform() if color == "cmyk" else (None, None)
+        self._pos = 0
+        self._offsets = {}
+        self._z = zlib.compressobj(6)
+        W, H = size
+        pw, ph = W * 72.0 / dpi, H * 72.0 / dpi
+        self._raw(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._obj(2, b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+        self._obj(3, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pw:.2f} {ph:.2f}] "
+                      f"/Resources << /XObject << /Im0 4 0 R >> >> /Contents 5 0 R >>").encode())
+        content = f"q {pw:.2f} 0 0 {ph:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._obj(5, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        if icc:
+            data = zlib.compress(icc)
+            self._obj(7, b"<< /N 4 /Alternate /DeviceCMYK /Filter /FlateDecode /Length %d >>\nstream\n" % len(data)
+                      + data + b"\nendstream")
+            colorspace = "[/ICCBased 7 0 R]"
+        else:
+            colorspace = "/DeviceCMYK" if color == "cmyk" else "/DeviceRGB"
+        self._offsets[4] = self._pos
+        self._raw((f"4 0 obj\n<< /Type /XObject /Subtype /Image /Width {W} /Height {H} /ColorSpace {colorspace} "
+                   f"/BitsPerComponent 8 /Filter /FlateDecode /Length 6 0 R >>\nstream\n").encode())
+        self._stream_start = self._pos
+
+    def _raw(self, data: bytes):
+        self.fp.write(data)
+        self._pos += len(data)
+
+    def _obj(self, num: int, body: bytes):
+        self._offsets[num] = self._pos
+        self._raw(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    @traced("encode_pdf")
+    def write(self, strip: Image.Image):
+        if self.color == "cmyk":
+            strip = to_cmyk(strip, self._transform)
+        elif strip.mode != "RGB":
+            strip = strip.convert("RGB")
+        data = self._z.compress(strip.tobytes())
+        if data:
+            self._raw(data)
+
+    def close(self):
+        self._raw(self._z.flush())
+        length = self._pos - self._stream_start
+        self._raw(b"\nendstream\nendobj\n")
+        self._obj(6, b"%d" % length)
+        xref = self._pos
+        count = max(self._offsets) + 1
+        self._raw(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+        for num in range(1, count):
+            self._raw(b"%010d 00000 n \n" % self._offsets[num])
+        self._raw(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+
+
+def save_large_card(payload: dict, dpi=300, progress=None):
+    """
+    Render kartu besar per strip langsung ke file PNG & PDF hasil, tanpa buffer penuh di memori.
+    `progress(frac, stage)` (opsional) dipanggil setiap strip selesai.
+    """
+    size = card_size(payload)
+    with result_files("png", "pdf") as ((fpng, png_url), (fpdf, pdf_url)):
+        png = PngStripWriter(fpng, size)
+        pdf = PdfStripWriter(fpdf, size, dpi=dpi, color=pdf_color(payload))
+        done = 0
+        for strip in render_card_strips(payload):
+            png.write(strip)
+            pdf.write(strip)
+            done += strip.height
+            if progress:
+                progress(done / size[1], "render & encode strip")
+        png.close()
+        pdf.close()
+    return png_url, pdf_url
+
+
+def export_card(payload: dict, dpi=300, progress=None):
+    """Render kartu lalu encode PNG + PDF langsung ke file result store; return (png_url, pdf_url)."""
+    pdf_color(payload)
+    if is_large_format(card_size(payload)):
+        return save_large_card(payload, dpi=dpi, progress=progress)
+    if progress:
+        progress(0.05, "render")
+    img = render_card(payload)
+    if progress:
+        progress(0.6, "encode PNG & PDF")
+    pool = render_pool() if use_parallel(payload, img.size) else None
+    with result_files("png", "pdf") as ((fpng, png_url), (fpdf, pdf_url)):
+        png_f = pool.submit(write_png, img, fpng) if pool else None
+        try:
+            write_pdf(img, fpdf, dpi=dpi, color=pdf_color(payload))
+        finally:
+            # PDF gagal: writer PNG di pool harus selesai dulu sebelum result_files menutup & menghapus file
+            if png_f and not png_f.cancel():
+                wait_futures([png_f])
+        if png_f:
+            png_f.result()
+        else:
+            write_png(img, fpng)
+    return png_url, pdf_url
+
+
+# ====== Admission control & fair render queue ======
+
+class RenderBusy(Exception):
+    def __init__(self, retry_after=1.0, message="Server sedang sibuk, coba lagi sebentar."):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket per key; key yang lama menganggur dibuang supaya dict tidak tumbuh terus."""
+
+    def __init__(self, rate: float, burst: float, idle_ttl=600):
+        self.rate = rate
+        self.burst = burst
+        self.idle_ttl = idle_ttl
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str):
+        """Ambil satu token. Return 0 bila boleh, atau detik sampai token berikutnya tersedia."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if len(self._buckets) > 10000:
+                cutoff = now - self.idle_ttl
+                self._buckets = {k: v for k, v in self._buckets.items() if v[1] >= cutoff}
+            return wait
+
+
+class RenderScheduler:
+    """
+    Slot render terbatas dengan antrean adil.
+    Giliran berikutnya: prioritas terkecil dulu (generate sebelum preview), lalu klien dengan render aktif
+    paling sedikit, lalu yang datang lebih dulu. Preview baru dari klien yang sama menggantikan preview
+    lamanya yang masih antre (editor hanya butuh hasil terbaru).
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.active = 0
+        self._by_client = {}
+        self._waiting = []  # [priority, seq, client, state]; state None=antre, True=dapat slot, False=batal
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, client: str, priority: int, timeout: float) -> bool:
+        with self._cond:
+            if priority == PRIORITY_PREVIEW:
+                for t in self._waiting:
+                    if t[2] == client and t[0] == PRIORITY_PREVIEW:
+                        t[3] = False
+                self._waiting = [t for t in self._waiting if t[3] is None]
+            ticket = [priority, next(self._seq), client, None]
+            self._waiting.append(ticket)
+            self._dispatch()
+            deadline = time.monotonic() + timeout
+            while ticket[3] is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    return False
+                self._cond.wait(remaining)
+            return ticket[3]
+
+    def release(self, client: str):
+        with self._cond:
+            self.active -= 1
+            n = self._by_client.get(client, 1) - 1
+            if n:
+                self._by_client[client] = n
+            else:
+                self._by_client.pop(client, None)
+            self._dispatch()
+
+    def _dispatch(self):
+        while self.active < self.slots and self._waiting:
+            best = min(self._waiting, key=lambda t: (t[0], self._by_client.get(t[2], 0), t[1]))
+            self._waiting.remove(best)
+            best[3] = True
+            self.active += 1
+            self._by_client[best[2]] = self._by_client.get(best[2], 0) + 1
+        self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {"slots": self.slots, "active": self.active, "queued": len(self._waiting)}
+
+
+class QualityGovernor:
+    """
+    Pilih level kualitas preview dari tekanan render: jumlah render antre per slot di scheduler dan EWMA
+    latensi preview (termasuk waktu antre). Kualitas baru naik lagi setelah tekanan jelas turun (histeresis),
+    dan EWMA meluruh selama tidak ada preview supaya lonjakan lama tidak menurunkan preview berikutnya.
+    """
+
+    def __init__(self, scheduler, latency_ms=DEGRADE_LATENCY_MS, queue_depth=DEGRADE_QUEUE_DEPTH):
+        self.scheduler = scheduler
+        self.latency_ms = latency_ms
+        self.queue_depth = queue_depth
+        self.level = 0
+        self._ewma_ms = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _latency(self, now):
+        return self._ewma_ms * 0.5 ** (max(0.0, now - self._last) / QUALITY_DECAY_SECONDS)
+
+    def observe(self, ms: float):
+        """Catat latensi satu preview yang dirender (ms, dari request masuk sampai PNG siap)."""
+        now = time.monotonic()
+        with self._lock:
+            ewma = self._latency(now)
+            self._ewma_ms = ewma + QUALITY_EWMA_ALPHA * (ms - ewma)
+            self._last = now
+
+    def pressure(self) -> float:
+        """>= 1 berarti level 1, >= 2 level 2, dst."""
+        snap = self.scheduler.snapshot()
+        queued = snap["queued"] / max(1, snap["slots"]) / self.queue_depth if self.queue_depth > 0 else 0.0
+        with self._lock:
+            latency = self._latency(time.monotonic()) / self.latency_ms if self.latency_ms > 0 else 0.0
+        return max(queued, latency)
+
+    def choose(self) -> str:
+        """Nama level kualitas untuk preview berikutnya."""
+        if not QUALITY_GOVERNOR:
+            return "full"
+        p = self.pressure()
+        with self._lock:
+            target = min(len(QUALITY_LEVELS) - 1, int(p))
+            if target < self.level and p >= self.level * QUALITY_RECOVER:
+                target = self.level
+            self.level = target
+        return QUALITY_LEVELS[target]["name"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latency = self._latency(time.monotonic())
+        return {"level": QUALITY_LEVELS[self.level]["name"], "latency_ewma_ms": round(latency, 1),
+                "pressure": round(self.pressure(), 3)}
+
+
+render_scheduler = RenderScheduler(RENDER_SLOTS)
+quality_governor = QualityGovernor(render_scheduler)
+preview_buckets = TokenBucket(PREVIEW_RATE, PREVIEW_BURST)
+ip_buckets = TokenBucket(PREVIEW_RATE * IP_RATE_FACTOR, PREVIEW_BURST * IP_RATE_FACTOR)
+
+
+def _signed_cid(cid: str) -> str:
+    return cid + "." + hmac.new(CLIENT_SECRET, cid.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def client_id():
+    """Id sesi dari cookie `cid` yang ditandatangani server; None bila tidak ada atau tanda tangannya salah."""
+    raw = request.cookies.get("cid", "")
+    cid = raw.partition(".")[0]
+    return cid if cid and hmac.compare_digest(raw, _signed_cid(cid)) else None
+
+
+def client_key() -> str:
+    # cookie karangan klien tidak diakui: tanpa cid sah, bucket sesi jatuh ke IP (tidak bisa dapat bucket baru
+    # dengan mengganti cookie tiap request)
+    cid = client_id()
+    return f"cid:{cid}" if cid else (request.remote_addr or "-")
+
+
+def admit_preview(client: str):
+    """Cek token bucket sesi & IP sebelum body request diparse; raise RenderBusy bila habis."""
+    wait = max(preview_buckets.take(client), ip_buckets.take(request.remote_addr or "-"))
+    if wait:
+        raise RenderBusy(retry_after=wait)
+
+
+@contextmanager
+def render_slot(client: str, priority: int):
+    timeout = GENERATE_QUEUE_TIMEOUT if priority == PRIORITY_GENERATE else PREVIEW_QUEUE_TIMEOUT
+    if not render_scheduler.acquire(client, priority, timeout):
+        raise RenderBusy(retry_after=0.5)
+    try:
+        yield
+    finally:
+        render_scheduler.release(client)
+
+
+def degrade_preview(payload: dict) -> str:
+    """
+    Terapkan level kualitas dari governor ke payload preview (in place): ukuran diperkecil dengan rasio yang
+    sama (tidak di bawah ukuran minimum kartu), sisanya dibaca render lewat payload["quality"].
+    """
+    name = quality_governor.choose()
+    scale = QUALITY[name]["scale"]
+    if scale < 1:
+        W, H = card_size(payload)
+        scale = min(1.0, max(scale, 400 / W, 250 / H))
+        payload["size"] = f"{round(W * scale)}x{round(H * scale)}"
+    payload["quality"] = name
+    return name
+
+
+def render_preview_png(payload: dict) -> bytes:
+    """PNG preview kartu ukuran biasa (kartu besar: stream_preview). Level draft memakai kompresi PNG ringan."""
+    return pil_to_png_bytes(render_card(payload), compress_level=payload_quality(payload)["png_level"])
+
+
+def iter_png_strips(payload: dict, compress_level=6):
+    """PNG kartu besar sebagai potongan bytes per strip (untuk response chunked), tanpa buffer PNG penuh."""
+    buf = io.BytesIO()
+
+    def drain():
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return data
+
+    writer = PngStripWriter(buf, card_size(payload), compress_level=compress_level)
+    for strip in render_card_strips(payload):
+        writer.write(strip)
+        chunk = drain()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield drain()
+
+
+def stream_preview(client: str, payload: dict, t0: float, headers: dict) -> Response:
+    """
+    Preview kartu besar sebagai response chunked: tiap strip di-render, di-encode lalu langsung dikirim.
+    Slot render & capture dipegang sampai strip terakhir terkirim atau koneksi ditutup; RenderBusy saat
+    mengambil slot tetap naik ke route (jadi 429 seperti biasa).
+    """
+    with ExitStack() as stack:
+        stack.enter_context(render_slot(client, PRIORITY_PREVIEW))
+        stack.enter_context(capture_render("preview", payload))
+        hold = stack.pop_all()
+
+    def body():
+        try:
+            yield from iter_png_strips(payload, payload_quality(payload)["png_level"])
+        finally:
+            hold.close()
+        quality_governor.observe((time.perf_counter() - t0) * 1000)
+
+    resp = Response(stream_with_context(body()), mimetype="image/png", headers=headers)
+    resp.call_on_close(hold.close)  # response yang ditutup sebelum sempat dialirkan tetap melepas slot
+    return resp
+
+
+def busy_response(retry_after: float):
+    resp = jsonify({"busy": True, "retry_after_ms": int(retry_after * 1000)})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return resp
+
+
+CLIENT_COOKIE_ENDPOINTS = ("index", "api_preview", "api_card_preview")
+
+
+@app.after_request
+def _issue_client_cookie(resp):
+    """Halaman editor & preview pertama membagikan cookie `cid` bertanda tangan (juga saat 429)."""
+    if request.endpoint in CLIENT_COOKIE_ENDPOINTS and client_id() is None:
+        resp.set_cookie("cid", _signed_cid(uuid.uuid4().hex), samesite="Lax", httponly=True)
+    return resp
+
+
+CARD_FIELDS = ("name", "title", "company", "email", "phone", "address", "url", "theme", "accent", "size", "color")
+CARD_DEFAULTS = {"theme": "pro-modern", "accent": "#3b82f6", "size": "1050x600", "color": "rgb"}
+
+
+# ====== Card spec ======
+# CardSpec: model kartu yang tervalidasi & immutable. Dipakai API JSON (tanpa multipart; logo dirujuk lewat
+# id hasil upload ke /api/logos) dan sebagai konversi bersama dari form editor. `key` adalah hash kanonik
+# yang stabil antar proses, cocok sebagai key cache & ETag.
+
+TEXT_FIELDS = ("name", "title", "company", "email", "phone", "address", "url")
+MAX_TEXT_LEN = 300       # hanya API JSON; form editor tidak dibatasi
+DPI_MIN, DPI_MAX = 36, 2400
+
+
+@dataclass(frozen=True, slots=True)
+class CardSpec:
+    name: str = ""
+    title: str = ""
+    company: str = ""
+    email: str = ""
+    phone: str = ""
+    address: str = ""
+    url: str = ""
+    theme: str = "pro-modern"
+    accent: tuple = (59, 130, 246)
+    size: tuple = (1050, 600)
+    logo_id: str = ""
+    dpi: int = 300
+    color: str = "rgb"
+    key: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for f in TEXT_FIELDS:
+            if not isinstance(getattr(self, f), str):
+                raise ValueError(f"Field {f} harus teks.")
+        if self.theme not in THEMES:
+            raise ValueError(f"Tema tidak dikenal: {self.theme}")
+        if not (isinstance(self.accent, tuple) and len(self.accent) == 3
+                and all(isinstance(c, int) and 0 <= c <= 255 for c in self.accent)):
+            raise ValueError("accent harus warna #rrggbb atau [r, g, b].")
+        card_size({"size": "{}x{}".format(*self.size)})
+        if self.logo_id and not LOGO_ID_RE.fullmatch(self.logo_id):
+            raise ValueError("logo_id tidak valid.")
+        if not isinstance(self.dpi, int) or self.dpi <= 0:
+            raise ValueError("DPI harus bilangan bulat positif.")
+        pdf_color({"color": self.color})
+        object.__setattr__(self, "key", hashlib.blake2b(self.canonical().encode(), digest_size=16).hexdigest())
+
+    def canonical(self) -> str:
+        """JSON kanonik (urutan field tetap, tanpa spasi) - dasar `key`."""
+        return json.dumps([getattr(self, f) for f in CARD_SPEC_FIELDS], separators=(",", ":"))
+
+    def to_dict(self) -> dict:
+        d = {f: getattr(self, f) for f in CARD_SPEC_FIELDS}
+        d["accent"] = "#{:02x}{:02x}{:02x}".format(*self.accent)
+        d["size"] = "{}x{}".format(*self.size)
+        return d
+
+    def to_payload(self) -> dict:
+        """Payload untuk render_card/export_card; logo dibuka dari logo store."""
+        payload = self.to_dict()
+        payload["logo"] = open_logo(self.logo_id) if self.logo_id else None
+        return payload
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CardSpec":
+        """Dari JSON (ketat): field tak dikenal ditolak; accent "#hex"/[r,g,b], size "WxH"/[W,H]."""
+        if not isinstance(data, dict):
+            raise ValueError("Spec kartu harus objek JSON.")
+        unknown = set(data) - set(CARD_SPEC_FIELDS)
+        if unknown:
+            raise ValueError(f"Field tidak dikenal: {', '.join(sorted(unknown))}")
+        kw = dict(data)
+        if "accent" in kw:
+            kw["accent"] = _spec_accent(kw["accent"])
+        if "size" in kw:
+            kw["size"] = _spec_size(kw["size"])
+        spec = cls(**kw)
+        # batas ketat hanya untuk API JSON; form editor tetap menerima teks panjang seperti sebelumnya
+        for f in TEXT_FIELDS:
+            if len(getattr(spec, f)) > MAX_TEXT_LEN:
+                raise ValueError(f"Field {f} harus teks maksimal {MAX_TEXT_LEN} karakter.")
+        if not DPI_MIN <= spec.dpi <= DPI_MAX:
+            raise ValueError(f"DPI harus di antara {DPI_MIN} dan {DPI_MAX}.")
+        return spec
+
+    @classmethod
+    def from_form(cls, form) -> "CardSpec":
+        """Dari form editor (longgar seperti sebelumnya: nilai salah jatuh ke default)."""
+        theme = form.get("theme", "pro-modern")
+        return cls(
+            **{f: form.get(f, "") for f in TEXT_FIELDS},
+            theme=theme if theme in THEMES else "pro-modern",
+            accent=parse_color(form.get("accent", "#3b82f6")),
+            size=parse_size(form.get("size", "1050x600")),
+            logo_id=form.get("logo_id", ""),
+            dpi=min(max(_form_int(form.get("dpi"), 300), DPI_MIN), DPI_MAX),
+            color=form.get("color") or "rgb",
+        )
+
+
+CARD_SPEC_FIELDS = tuple(f for f in CardSpec.__dataclass_fields__ if f != "key")
+
+
+def _form_int(v, default: int) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def _spec_accent(v):
+    if isinstance(v, str):
+        rgb = parse_color(v, default=None)
+        if rgb is None:
+            raise ValueError(f"accent tidak valid: {v}")
+        return rgb
+    if isinstance(v, (list, tuple)):
+        return tuple(v)
+    raise ValueError("accent harus warna #rrggbb atau [r, g, b].")
+
+
+def _spec_size(v):
+    if isinstance(v, str):
+        size = parse_size(v, default=None)
+        if size is None:
+            raise ValueError(f"size tidak valid: {v} (format LEBARxTINGGI)")
+        return size
+    if isinstance(v, (list, tuple)) and len(v) == 2 and all(isinstance(n, int) for n in v):
+        return parse_size("{}x{}".format(*v))
+    raise ValueError("size harus \"LEBARxTINGGI\" atau [lebar, tinggi].")
+
+
+# ---------- Logo store ----------
+# Logo di-upload sekali (POST /api/logos) lalu dirujuk lewat id = hash isinya; file dibagi semua worker.
+
+def save_logo(data: bytes) -> str:
+    if len(data) > LOGO_MAX_BYTES:
+        raise ValueError(f"Logo maksimal {LOGO_MAX_BYTES // (1024 * 1024)} MB.")
+    try:
+        Image.open(io.BytesIO(data)).verify()
+    except Exception:
+        raise ValueError("File logo bukan gambar yang valid.")
+    logo_id = hashlib.sha256(data).hexdigest()[:32]
+    path = os.path.join(LOGO_DIR, logo_id)
+    if os.path.exists(path):
+        os.utime(path)
+        return logo_id
+    fd, tmp = tempfile.mkstemp(dir=LOGO_DIR, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return logo_id
+
+
+def open_logo(logo_id: str):
+    """Stream logo dari store; ValueError bila sudah kedaluwarsa / tidak ada."""
+    path = os.path.join(LOGO_DIR, logo_id)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # logo yang masih dipakai tidak ikut dibersihkan
+    except OSError:
+        raise ValueError(f"Logo {logo_id} tidak ditemukan; upload ulang lewat /api/logos.")
+    return io.BytesIO(data)
+
+
+def cleanup_logos():
+    cutoff = time.time() - LOGO_TTL_HOURS * 3600
+    for name in os.listdir(LOGO_DIR):
+        path = os.path.join(LOGO_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def card_payload(form, files) -> dict:
+    """Payload render dari form editor (field teks, dpi, dan logo: upload baru atau logo_id)."""
+    payload = CardSpec.from_form(form).to_payload()
+    logo_f = files.get("logo")
+    if logo_f and logo_f.filename:
+        payload["logo"] = logo_f.stream
+    return payload
 
 
 # ---------- Routes ----------
@@ -942,30 +2987,12 @@ def index():
     png_url = None
     pdf_url = None
 
+    # fallback tanpa JS; UI biasanya mengirim generate lewat /api/jobs
     if request.method == "POST" and request.form.get("action") == "generate":
-        form = request.form
-        payload = {
-            "name": form.get("name", ""),
-            "title": form.get("title", ""),
-            "company": form.get("company", ""),
-            "email": form.get("email", ""),
-            "phone": form.get("phone", ""),
-            "address": form.get("address", ""),
-            "url": form.get("url", ""),
-            "theme": form.get("theme", "pro-modern"),
-            "accent": form.get("accent", "#3b82f6"),
-            "size": form.get("size", "1050x600"),
-            "dpi": int(form.get("dpi", "300") or 300),
-        }
-        logo_f = request.files.get("logo")
-        payload["logo"] = (logo_f.stream if (logo_f and logo_f.filename) else None)
-
         try:
-            img = render_card(payload)
-            png_bytes = pil_to_png_bytes(img)
-            pdf_bytes = pil_to_pdf_bytes(img, dpi=payload["dpi"])
-            png_url = save_result(png_bytes, "png")
-            pdf_url = save_result(pdf_bytes, "pdf")
+            payload = card_payload(request.form, request.files)
+            with render_slot(client_key(), PRIORITY_GENERATE), capture_render("generate", payload):
+                png_url, pdf_url = export_card(payload, dpi=payload["dpi"])
         except Exception as e:
             return render_template_string(
                 HTML,
@@ -989,26 +3016,24 @@ def index():
 # Live preview: same engine, returns PNG bytes
 @app.route("/api/preview", methods=["POST"])
 def api_preview():
-    form = request.form
-    payload = {
-        "name": form.get("name", ""),
-        "title": form.get("title", ""),
-        "company": form.get("company", ""),
-        "email": form.get("email", ""),
-        "phone": form.get("phone", ""),
-        "address": form.get("address", ""),
-        "url": form.get("url", ""),
-        "theme": form.get("theme", "pro-modern"),
-        "accent": form.get("accent", "#3b82f6"),
-        "size": form.get("size", "1050x600"),
-    }
-    logo_f = request.files.get("logo")
-    payload["logo"] = (logo_f.stream if (logo_f and logo_f.filename) else None)
+    t0 = time.perf_counter()
+    client = client_key()
+    try:
+        admit_preview(client)
+    except RenderBusy as e:
+        return busy_response(e.retry_after)
 
     try:
-        img = render_card(payload)
-        png = pil_to_png_bytes(img)
-        return Response(png, mimetype="image/png")
+        payload = card_payload(request.form, request.files)
+        quality = degrade_preview(payload)
+        if is_large_format(card_size(payload)):
+            return stream_preview(client, payload, t0, {"X-Card-Quality": quality})
+        with render_slot(client, PRIORITY_PREVIEW), capture_render("preview", payload):
+            png = render_preview_png(payload)
+        quality_governor.observe((time.perf_counter() - t0) * 1000)
+        return Response(png, mimetype="image/png", headers={"X-Card-Quality": quality})
+    except RenderBusy as e:
+        return busy_response(e.retry_after)
     except Exception as e:
         # return tiny error image so UI tetap jalan
         err = Image.new("RGB", (800, 200), (255, 240, 240))
@@ -1018,24 +3043,540 @@ def api_preview():
         return Response(bio.getvalue(), mimetype="image/png")
 
 
+# ---------- JSON API (CardSpec) ----------
+_preview_cache = OrderedDict()  # spec.key -> PNG; edit bolak-balik (undo, ganti tema lalu kembali) langsung kena
+_preview_cache_lock = threading.Lock()
+
+
+@app.route("/api/logos", methods=["POST"])
+def api_logos():
+    """Upload logo sekali (multipart field `logo` atau body gambar mentah); return logo_id untuk CardSpec."""
+    f = request.files.get("logo")
+    data = f.read() if f else request.get_data()
+    try:
+        cleanup_logos()
+        logo_id = save_logo(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"logo_id": logo_id}), 201
+
+
+@app.route("/api/card", methods=["POST"])
+def api_card_spec():
+    """Validasi & normalisasi CardSpec JSON; return bentuk kanonik + key."""
+    try:
+        spec = CardSpec.from_dict(request.get_json(force=True, silent=True))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"key": spec.key, "spec": spec.to_dict()})
+
+
+@app.route("/api/card/preview", methods=["POST"])
+def api_card_preview():
+    """
+    Preview PNG dari CardSpec JSON. ETag = spec.key, jadi klien bisa memakai If-None-Match.
+    Preview yang diturunkan governor tidak diberi ETag & tidak masuk cache, supaya versi penuh tetap diminta nanti.
+    """
+    t0 = time.perf_counter()
+    client = client_key()
+    try:
+        spec = CardSpec.from_dict(request.get_json(force=True, silent=True))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = f'"{spec.key}"'
+    # revalidasi 304 murah (tanpa render): dijawab sebelum admission supaya tidak memakan token bucket.
+    # If-None-Match memakai perbandingan lemah (RFC 9110), "*" juga cocok
+    if request.if_none_match.contains_weak(spec.key):
+        return Response(status=304, headers={"ETag": etag})
+    try:
+        admit_preview(client)
+    except RenderBusy as e:
+        return busy_response(e.retry_after)
+    with _preview_cache_lock:
+        png = _preview_cache.get(spec.key)
+        if png is not None:
+            _preview_cache.move_to_end(spec.key)
+    quality = "full"
+    if png is None:
+        try:
+            payload = spec.to_payload()
+            quality = degrade_preview(payload)
+            if is_large_format(card_size(payload)):
+                # kartu besar tidak masuk cache preview; isinya tetap deterministik, jadi ETag boleh dipakai
+                headers = {"X-Card-Quality": quality, "Cache-Control": "no-store"}
+                if quality == "full":
+                    headers.update({"ETag": etag, "Cache-Control": "private, max-age=0"})
+                return stream_preview(client, payload, t0, headers)
+            with render_slot(client, PRIORITY_PREVIEW), capture_render("preview", payload):
+                png = render_preview_png(payload)
+        except RenderBusy as e:
+            return busy_response(e.retry_after)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        quality_governor.observe((time.perf_counter() - t0) * 1000)
+        if quality != "full":
+            return Response(png, mimetype="image/png", headers={"X-Card-Quality": quality, "Cache-Control": "no-store"})
+        if len(png) <= PREVIEW_CACHE_MAX_BYTES:
+            with _preview_cache_lock:
+                _preview_cache[spec.key] = png
+                while len(_preview_cache) > PREVIEW_CACHE_ITEMS:
+                    _preview_cache.popitem(last=False)
+    return Response(png, mimetype="image/png",
+                    headers={"ETag": etag, "Cache-Control": "private, max-age=0", "X-Card-Quality": quality})
+
+
+# ====== Theme gallery ======
+# Satu payload dirender ke banyak tema x aksen sekaligus: fitting teks, decode logo dan matriks QR dihitung
+# sekali (retheme_layout), background per tema diambil dari cache, tile dilukis paralel di pool bersama.
+
+def render_gallery(payload: dict, themes: list, accents: list, thumb_w: int = GALLERY_THUMB_WIDTH) -> list:
+    """Return [(theme, accent_hex, image)] berukuran thumbnail dengan rasio kartu dari payload."""
+    W, H = card_size(payload)
+    size = (thumb_w, max(1, round(thumb_w * H / W)))
+    base = layout_card(dict(payload, theme=themes[0], accent=accents[0]), size)
+    variants = [(t, a) for t in themes for a in accents]
+
+    def tile(variant):
+        theme, accent = variant
+        canvas = Image.new("RGBA", size, (0, 0, 0, 0))
+        paint_card(canvas, retheme_layout(base, theme, parse_color(accent)))
+        return theme, accent, canvas
+
+    pool = render_pool() if len(variants) > 1 else None
+    return list(pool.map(tile, variants)) if pool else [tile(v) for v in variants]
+
+
+def contact_sheet(tiles: list, cols: int) -> Image.Image:
+    """Susun tile ke satu gambar grid berlabel (nama tema · aksen)."""
+    tw, th = tiles[0][2].size
+    gap, label_h = 16, 22
+    rows = math.ceil(len(tiles) / cols)
+    sheet = Image.new("RGB", (cols * tw + (cols + 1) * gap, rows * (th + label_h) + (rows + 1) * gap), (243, 244, 246))
+    draw = ImageDraw.Draw(sheet)
+    font = load_font(13, "semibold")
+    names = {p["hex"]: p["name"] for p in PALETTES}
+    for i, (theme, accent, img) in enumerate(tiles):
+        r, c = divmod(i, cols)
+        x, y = gap + c * (tw + gap), gap + r * (th + label_h + gap)
+        sheet.paste(img, (x, y), img)
+        draw.text((x, y + th + 4), f"{theme_plan(theme).title} · {names.get(accent, accent)}", font=font, fill=(55, 65, 81))
+    return sheet
+
+
+def multipart_tiles(tiles: list):
+    """Body multipart/mixed berisi satu PNG per tile; return (body, content_type)."""
+    boundary = uuid.uuid4().hex
+    pool = render_pool()
+    pngs = list(pool.map(pil_to_png_bytes, [t[2] for t in tiles])) if pool else [pil_to_png_bytes(t[2]) for t in tiles]
+    parts = []
+    for (theme, accent, _), png in zip(tiles, pngs):
+        name = f"{theme}-{accent.lstrip('#')}"
+        parts.append((f"--{boundary}\r\nContent-Type: image/png\r\n"
+                      f"Content-Disposition: inline; name=\"{name}\"; filename=\"{name}.png\"\r\n"
+                      f"X-Theme: {theme}\r\nX-Accent: {accent}\r\nContent-Length: {len(png)}\r\n\r\n").encode() + png + b"\r\n")
+    return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/mixed; boundary={boundary}"
+
+
+def _form_list(form, name: str) -> list:
+    # terima field berulang (themes=a&themes=b) maupun dipisah koma (themes=a,b)
+    return [v.strip() for raw in form.getlist(name) for v in raw.split(",") if v.strip()]
+
+
+@app.route("/api/gallery", methods=["POST"])
+def api_gallery():
+    """
+    Render payload form ke beberapa tema & aksen sekaligus.
+    Field tambahan: themes (default semua), accents (default aksen form; "all" = semua PALETTES),
+    thumb (lebar tile, px), format = sheet (PNG contact sheet, default) | multipart (satu PNG per tile).
+    """
+    client = client_key()
+    try:
+        admit_preview(client)
+    except RenderBusy as e:
+        return busy_response(e.retry_after)
+
+    try:
+        payload = card_payload(request.form, request.files)
+        themes = _form_list(request.form, "themes") or list(THEMES)
+        unknown = [t for t in themes if t not in THEMES]
+        if unknown:
+            raise ValueError(f"Tema tidak dikenal: {', '.join(unknown)}")
+        accents = _form_list(request.form, "accents") or [payload["accent"]]
+        if accents == ["all"]:
+            accents = [p["hex"] for p in PALETTES]
+        thumb_w = int(request.form.get("thumb") or GALLERY_THUMB_WIDTH)
+        if not 64 <= thumb_w <= GALLERY_MAX_THUMB_WIDTH:
+            raise ValueError(f"Lebar thumbnail harus 64-{GALLERY_MAX_THUMB_WIDTH} px.")
+        if len(themes) * len(accents) > GALLERY_MAX_TILES:
+            raise ValueError(f"Maksimal {GALLERY_MAX_TILES} kombinasi tema x aksen per request.")
+        fmt = request.form.get("format") or "sheet"
+        if fmt not in ("sheet", "multipart"):
+            raise ValueError("format harus sheet atau multipart.")
+
+        with render_slot(client, PRIORITY_PREVIEW):
+            tiles = render_gallery(payload, themes, accents, thumb_w)
+            if fmt == "multipart":
+                body, content_type = multipart_tiles(tiles)
+            else:
+                cols = len(accents) if len(accents) > 1 else min(4, len(tiles))
+                body, content_type = pil_to_png_bytes(contact_sheet(tiles, cols)), "image/png"
+        return Response(body, content_type=content_type)
+    except RenderBusy as e:
+        return busy_response(e.retry_after)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+# ====== Background jobs ======
+# Generate resolusi tinggi & ekspor batch lewat antrean job: request cuma menyimpan job lalu langsung
+# menjawab job id; thread worker di tiap proses mengambil job dari sqlite, merender ke result store, dan
+# melaporkan progres (polling / SSE). Job yang macet karena proses mati diantrekan ulang otomatis.
+
+class JobQueue:
+    """Antrean job persisten di sqlite; aman dipakai banyak thread & proses sekaligus."""
+
+    TERMINAL = ("done", "failed")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, cards TEXT NOT NULL, "
+            "dpi INTEGER NOT NULL, progress REAL NOT NULL DEFAULT 0, stage TEXT, result TEXT, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def submit(self, cards: list, dpi: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._db().execute("INSERT INTO jobs (id, status, cards, dpi, stage, created, updated) "
+                           "VALUES (?, 'queued', ?, ?, 'antre', ?, ?)", (job_id, json.dumps(cards), dpi, now, now))
+        return job_id
+
+    def get(self, job_id: str):
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"], "status": row["status"], "progress": round(row["progress"], 3), "stage": row["stage"],
+            "cards": json.loads(row["result"]) if row["result"] else [], "error": row["error"],
+            "created": row["created"], "updated": row["updated"],
+        }
+
+    def claim(self):
+        """Ambil job antre tertua (atomik antar proses); None bila kosong."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover(db)
+            row = db.execute("SELECT id, cards, dpi, attempts FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET status = 'running', stage = 'mulai', attempts = attempts + 1, updated = ? "
+                           "WHERE id = ?", (time.time(), row["id"]))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        # `attempt` menandai claim ini: setelah _recover mengantrekan ulang job, worker lama tidak bisa menulis lagi
+        return {"id": row["id"], "cards": json.loads(row["cards"]), "dpi": row["dpi"], "attempt": row["attempts"] + 1}
+
+    def _recover(self, db: sqlite3.Connection):
+        # job 'running' tanpa kabar lebih dari JOB_STALE_SECONDS: workernya mati (restart/crash)
+        now = time.time()
+        stale = now - JOB_STALE_SECONDS
+        db.execute("UPDATE jobs SET status = 'failed', error = 'Worker berhenti berulang kali saat memproses job', "
+                   "updated = ? WHERE status = 'running' AND updated < ? AND attempts >= ?", (now, stale, JOB_MAX_ATTEMPTS))
+        db.execute("UPDATE jobs SET status = 'queued', stage = 'antre ulang', progress = 0, updated = ? "
+                   "WHERE status = 'running' AND updated < ?", (now, stale))
+        db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?", (now - JOB_RETENTION_HOURS * 3600,))
+
+    # update/finish/fail hanya berlaku untuk claim yang masih dipegang (status running & attempt sama);
+    # return False bila claim sudah diambil alih
+    def update(self, job_id: str, attempt: int, progress: float, stage: str) -> bool:
+        return self._db().execute(
+            "UPDATE jobs SET progress = ?, stage = ?, updated = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+            (progress, stage, time.time(), job_id, attempt)).rowcount > 0
+
+    def finish(self, job_id: str, attempt: int, cards: list) -> bool:
+        return self._db().execute(
+            "UPDATE jobs SET status = 'done', progress = 1, stage = 'selesai', result = ?, updated = ? "
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (json.dumps(cards), time.time(), job_id, attempt)).rowcount > 0
+
+    def fail(self, job_id: str, attempt: int, error: str) -> bool:
+        return self._db().execute(
+            "UPDATE jobs SET status = 'failed', stage = 'gagal', error = ?, updated = ? "
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (error, time.time(), job_id, attempt)).rowcount > 0
+
+
+job_queue = JobQueue(JOB_DB)
+_job_wakeup = threading.Event()
+_job_workers = (None, [])  # (pid, threads): thread tidak ikut ter-fork, jadi dicatat per proses
+
+
+def run_next_job(queue=None) -> bool:
+    """Proses satu job antre; False bila antrean kosong."""
+    queue = queue or job_queue
+    job = queue.claim()
+    if job is None:
+        return False
+    cards, total = [], len(job["cards"])
+    try:
+        for i, card in enumerate(job["cards"]):
+            payload = dict(card, dpi=job["dpi"], logo=io.BytesIO(base64.b64decode(card["logo"])) if card.get("logo") else None)
+
+            def progress(frac, what, i=i):
+                return queue.update(job["id"], job["attempt"], (i + frac) / total,
+                                    f"kartu {i + 1}/{total}: {what}" if total > 1 else what)
+
+            # job ikut antre di slot render seperti generate biasa, tanpa batas waktu tunggu; tiap percobaan
+            # memperbarui `updated` supaya _recover di worker lain tidak mengira job ini macet lalu menjalankannya lagi
+            while True:
+                if not progress(0, "menunggu slot render"):
+                    return True  # claim sudah diambil alih worker lain: berhenti tanpa menulis hasil
+                try:
+                    with render_slot(f"job:{job['id']}", PRIORITY_GENERATE), capture_render("job", payload):
+                        png_url, pdf_url = export_card(payload, dpi=job["dpi"], progress=progress)
+                    break
+                except RenderBusy as e:
+                    time.sleep(e.retry_after)
+            cards.append({"png_url": png_url, "pdf_url": pdf_url})
+    except Exception as e:
+        queue.fail(job["id"], job["attempt"], str(e))
+    else:
+        queue.finish(job["id"], job["attempt"], cards)
+    return True
+
+
+def _job_worker_loop():
+    while True:
+        try:
+            if run_next_job():
+                continue
+        except sqlite3.Error:
+            pass  # db sibuk/terkunci lama: coba lagi di putaran berikut
+        _job_wakeup.wait(JOB_POLL_INTERVAL)
+        _job_wakeup.clear()
+
+
+def start_job_workers():
+    """Jalankan JOB_WORKERS thread worker di proses ini (idempoten, aman setelah fork)."""
+    global _job_workers
+    with _render_pool_lock:
+        if _job_workers[0] == os.getpid() or JOB_WORKERS <= 0:
+            return
+        threads = [threading.Thread(target=_job_worker_loop, name=f"card-job-{i}", daemon=True) for i in range(JOB_WORKERS)]
+        _job_workers = (os.getpid(), threads)
+        for t in threads:
+            t.start()
+
+
+def _inline_logo(data) -> bytes:
+    """Logo base64 inline di job JSON; divalidasi saat submit, bukan baru gagal di worker."""
+    if not data:
+        return b""
+    try:
+        raw = base64.b64decode(data, validate=True)
+        Image.open(io.BytesIO(raw)).verify()
+    except Exception:
+        raise ValueError("logo harus gambar base64 yang valid.")
+    return raw
+
+
+def _job_cards_from_request():
+    """Kartu untuk job: form (satu kartu + logo) atau JSON {"cards": [...], "dpi": ...}."""
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ValueError("Body JSON harus objek {\"cards\": [...], \"dpi\": ...}.")
+        raw = body.get("cards") if isinstance(body.get("cards"), list) else [body]
+        dpi = body.get("dpi", 300)
+        cards = []
+        for c in raw:
+            spec = CardSpec.from_dict({k: v for k, v in c.items() if k != "logo"} if isinstance(c, dict) else c)
+            card = {k: v for k, v in spec.to_dict().items() if k in CARD_FIELDS}
+            # logo lewat logo_id (disarankan) atau base64 inline
+            logo = open_logo(spec.logo_id).getvalue() if spec.logo_id else _inline_logo(c.get("logo"))
+            cards.append(dict(card, logo=base64.b64encode(logo).decode() if logo else ""))
+    else:
+        payload = card_payload(request.form, request.files)
+        dpi = payload.pop("dpi")
+        logo = payload.pop("logo")
+        cards = [dict(payload, logo=base64.b64encode(logo.read()).decode() if logo else "")]
+    return cards, dpi
+
+
+@app.route("/api/jobs", methods=["POST"])
+def api_jobs_submit():
+    try:
+        cards, dpi = _job_cards_from_request()
+        dpi = int(dpi)
+        if not cards or len(cards) > JOB_MAX_CARDS:
+            raise ValueError(f"Job harus berisi 1-{JOB_MAX_CARDS} kartu.")
+        if not DPI_MIN <= dpi <= DPI_MAX:
+            raise ValueError(f"DPI harus di antara {DPI_MIN} dan {DPI_MAX}.")
+        for card in cards:
+            card_size(card)  # tolak ukuran kebesaran / opsi salah sebelum masuk antrean
+            pdf_color(card)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    job_id = job_queue.submit(cards, dpi)
+    start_job_workers()
+    _job_wakeup.set()
+    resp = jsonify({"id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}",
+                    "events_url": f"/api/jobs/{job_id}/events"})
+    resp.status_code = 202
+    resp.headers["Location"] = f"/api/jobs/{job_id}"
+    return resp
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job tidak ditemukan"}), 404
+    if job["status"] not in JobQueue.TERMINAL:
+        start_job_workers()  # mis. proses baru setelah restart: pastikan ada yang memproses
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>/events")
+def api_job_events(job_id):
+    """
+    Server-Sent Events: kirim status job setiap kali berubah, selesai saat job done/failed.
+    Tiap koneksi menahan satu thread worker, jadi umurnya dibatasi JOB_EVENTS_MAX_SECONDS; klien
+    EventSource menyambung ulang sendiri setelah jeda `retry`. UI bawaan memakai polling /api/jobs/<id>.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Job tidak ditemukan"}), 404
+    start_job_workers()
+
+    def stream():
+        last, idle, deadline = None, 0.0, time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            job = job_queue.get(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["progress"], job["stage"])
+            if state != last:
+                last, idle = state, 0.0
+                yield f"data: {json.dumps(job)}\n\n"
+                if job["status"] in JobQueue.TERMINAL:
+                    return
+            elif idle >= JOB_EVENTS_KEEPALIVE:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            time.sleep(JOB_POLL_INTERVAL)
+            idle += JOB_POLL_INTERVAL
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ====== Warm-up & readiness ======
+
+def warm_up(sizes=None) -> float:
+    """
+    Panaskan cache font, background semua tema, encoder QR dan thumbnail tema.
+    Di gunicorn dipanggil sekali di master (lihat gunicorn.conf.py) sebelum worker di-fork.
+    """
+    t0 = time.time()
+    theme_previews()
+    for size in (sizes or WARMUP_SIZES):
+        for key in THEMES:
+            render_card({
+                "name": "Nama Kamu", "title": "Jabatan", "company": "Perusahaan", "email": "kamu@mail.com",
+                "phone": "+62 800", "address": "Jl. Contoh No. 1", "url": "https://example.com",
+                "theme": key, "size": size, "parallel": False,
+            })
+    _ready.set()
+    return time.time() - t0
+
+
+def start_warm_up():
+    """Warm-up di background thread (dev server / tanpa preload); aman dipanggil berkali-kali."""
+    global _warmup_thread
+    with _render_pool_lock:
+        if _ready.is_set() or _warmup_thread is not None:
+            return
+        _warmup_thread = threading.Thread(target=warm_up, name="card-warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def _after_fork_in_child():
+    # thread & lock milik parent tidak ikut ter-fork; cache (font/background/QR) tetap dipakai bersama
+    global _render_pool, _render_pool_lock, _bg_cache_lock, _warmup_thread
+    _render_pool = None
+    _render_pool_lock = threading.Lock()
+    _bg_cache_lock = threading.Lock()
+    memory_monitor.after_fork()
+    if not _ready.is_set():
+        _warmup_thread = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+@app.route("/readyz")
+def readyz():
+    if _ready.is_set():
+        return {"ready": True}, 200
+    start_warm_up()
+    return {"ready": False, "warming_up": True}, 503
+
+
+# ====== Memory diagnostics ======
+
+@app.before_request
+def _memory_begin():
+    if memory_monitor.enabled:
+        memory_monitor.start()
+        g.memory_mark = memory_monitor.begin()
+
+
+@app.teardown_request
+def _memory_end(exc):
+    mark = g.pop("memory_mark", None)
+    if mark is not None:
+        memory_monitor.end(mark, "endpoint", request.endpoint or "-")
+
+
+@app.route("/debug/memory")
+def debug_memory():
+    """Akuntansi memori per tahap/endpoint + situs alokasi yang tumbuh; hanya bila CARD_MEMORY_TRACE aktif."""
+    if not memory_monitor.enabled:
+        return jsonify({"error": "Aktifkan dengan CARD_MEMORY_TRACE=1."}), 404
+    if request.args.get("snapshot"):
+        memory_monitor.take_snapshot()
+    return jsonify(memory_monitor.report())
+
+
 # ====== Previews for theme cards (mini SVG to data URL) ======
 
+@render_memo(maxsize=None)
 def theme_previews():
     previews = {}
     for k, v in THEMES.items():
-        bg_token = v["bg"]
-        if isinstance(bg_token, tuple):
-            r, g, b = bg_token
-            bg = f"rgb({r},{g},{b})"
-        elif bg_token in ("gradient", "aurora", "satin"):
-            bg = "url(#g)"
-        elif bg_token in ("stripe", "lines", "carbon"):
-            bg = "url(#p)"
-        else:
-            bg = "#ffffff"
-        title = v["title"]
-        text_main = '#fff' if k in ['pro-dark','pro-glass','pro-gradient','pro-aurora','pro-carbon'] else '#1f2937'
-        text_sub  = '#e5e7eb' if k in ['pro-dark','pro-glass','pro-gradient','pro-aurora','pro-carbon'] else '#6b7280'
+        plan = theme_plan(k)
+        bg = plan.swatch
+        title = plan.title
+        text_main = '#fff' if plan.dark else '#1f2937'
+        text_sub  = '#e5e7eb' if plan.dark else '#6b7280'
         svg = f'''<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 160 100">
           <defs>
             <linearGradient id="g" x1="0" y1="0" x2="1" y2="1">
@@ -1059,4 +3600,6 @@ def theme_previews():
 if __name__ == "__main__":
     # pip install flask pillow qrcode[pil]
     # python card_maker_pro_plus.py -> http://localhost:5013/
+    start_warm_up()
+    start_job_workers()
     app.run(debug=True, host="0.0.0.0", port=5013)
@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py cibenCard:app
+#
+# preload_app: cibenCard di-import di master, warm_up() jalan sekali di sana (when_ready, sebelum worker
+# di-fork), lalu gc.freeze() supaya objek cache tidak disentuh GC dan tetap dibagi copy-on-write.
+# CARD_MEMORY_RECYCLE_MB: worker yang RSS-nya melewati batas diganti setelah request selesai (seperti max_requests).
+import gc
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5013")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+
+
+def when_ready(server):
+    import cibenCard
+    took = cibenCard.warm_up()
+    server.log.info("cibenCard warm-up selesai dalam %.1fs", took)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # thread worker job tidak ikut ter-fork dari master: jalankan di tiap worker
+    import cibenCard
+    cibenCard.start_job_workers()
+
+
+def post_request(worker, req, environ, resp):
+    import cibenCard
+    if worker.alive and cibenCard.memory_monitor.should_recycle():
+        worker.log.warning("RSS worker %s melewati %d MB, worker diganti", worker.pid, cibenCard.MEMORY_RECYCLE_MB)
+        worker.alive = False
@@ -0,0 +1,340 @@
+# loadtest.py
+"""
+Load generator untuk cibenCard: memutar ulang sesi editing (rekaman atau sintetis) ke server lokal.
+
+Sesi sintetis meniru front-end Alpine: ketikan beruntun di field teks memicu satu preview
+JSON `/api/card/preview` setelah jeda debounce 250 ms, ganti tema/aksen memicu preview, logo
+di-upload sekali ke `/api/logos` lalu dirujuk lewat logo_id, dan generate final dikirim ke
+`/api/jobs` lalu di-polling sampai selesai. Sebagian kecil sesi memakai jalur tanpa JS
+(multipart `/api/preview` + POST `/`), seperti browser lama atau saat fetch gagal.
+
+Contoh:
+    python loadtest.py --start-server --users 8 --duration 60
+    python loadtest.py --url http://127.0.0.1:5013 --users 4 --sessions 20 --record sesi.jsonl
+    python loadtest.py --start-server --replay sesi.jsonl --users 16 --json
+
+Hanya menerima target localhost; tidak ada request keluar.
+"""
+import argparse
+import http.cookiejar
+import io
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1", "[::1]")
+DEBOUNCE = 0.25  # sama dengan debounce(…, 250) di UI
+JOB_POLL = 1.0   # sama dengan pollJob di UI
+LEGACY_SESSIONS = 0.1  # porsi sesi tanpa JS
+SPEC_FIELDS = ("name", "title", "company", "email", "phone", "address", "url", "theme", "accent", "size")
+
+
+THEMES = ["pro-clean", "pro-modern", "pro-dark", "pro-glass", "pro-gradient", "pro-kraft",
+          "pro-mono", "pro-stripe", "pro-aurora", "pro-carbon", "pro-lines", "pro-satin"]
+ACCENTS = ["#4f46e5", "#3b82f6", "#0ea5e9", "#14b8a6", "#10b981", "#f59e0b", "#f97316", "#f43f5e"]
+SIZES = ["1050x600", "1004x614", "1260x756"]
+NAMES = ["Andi Wijaya", "Siti Rahma", "Budi Santoso", "Dewi Lestari", "Rizky Pratama"]
+TITLES = ["Software Engineer", "Product Designer", "Marketing Lead", "Founder & CEO"]
+COMPANIES = ["PT Contoh Maju", "Studio Kreatif", "Nusantara Tech", ""]
+
+
+# ---------- Sesi ----------
+
+def synthetic_session(rng: random.Random) -> list:
+    """
+    Satu sesi editing sebagai daftar langkah {"wait", "path", ...}.
+    `wait` = jeda (detik) sebelum request dikirim, dihitung dari request sebelumnya. Langkah berisi
+    "json" dikirim sebagai JSON (logo_id hasil upload ditambahkan bila "logo"), "fields" sebagai multipart,
+    "upload" meng-upload logo, dan "poll" mem-polling job sampai selesai.
+    """
+    legacy = rng.random() < LEGACY_SESSIONS
+    fields = {"action": "generate", "name": "", "title": "", "company": "", "email": "", "phone": "",
+              "address": "", "url": "", "theme": "pro-clean", "accent": "#3b82f6", "size": "1050x600", "dpi": "300"}
+    steps = []
+    pending = [0.0]  # waktu yang sudah lewat sejak request terakhir
+    logo = [False]
+
+    def preview():
+        wait = round(pending[0] + DEBOUNCE, 3)
+        if legacy:
+            steps.append({"wait": wait, "path": "/api/preview", "fields": dict(fields), "logo": logo[0]})
+        else:
+            steps.append({"wait": wait, "path": "/api/card/preview", "json": {k: fields[k] for k in SPEC_FIELDS},
+                          "logo": logo[0]})
+        pending[0] = 0.0
+
+    def type_field(key, value):
+        # ketikan per huruf; jeda > debounce memecah burst menjadi beberapa preview
+        typed = ""
+        for ch in value:
+            gap = rng.uniform(0.06, 0.22) if rng.random() > 0.08 else rng.uniform(0.3, 1.2)
+            if gap > DEBOUNCE and typed:
+                preview()
+            pending[0] += gap
+            typed += ch
+            fields[key] = typed
+        preview()
+
+    preview()  # preview awal saat halaman dibuka
+    type_field("name", rng.choice(NAMES))
+    type_field("title", rng.choice(TITLES))
+    if rng.random() < 0.7:
+        type_field("company", rng.choice(COMPANIES))
+    if rng.random() < 0.6:
+        type_field("email", "halo@contoh.id")
+    if rng.random() < 0.5:
+        type_field("url", "https://contoh.id/" + uuid.UUID(int=rng.getrandbits(128)).hex[:6])
+    for _ in range(rng.randint(1, 5)):
+        pending[0] += rng.uniform(0.5, 2.5)
+        fields["theme"] = rng.choice(THEMES)
+        preview()
+    if rng.random() < 0.5:
+        pending[0] += rng.uniform(0.5, 2.0)
+        fields["accent"] = rng.choice(ACCENTS)
+        preview()
+    if rng.random() < 0.4:
+        pending[0] += rng.uniform(1.0, 3.0)
+        logo[0] = True
+        if not legacy:
+            steps.append({"wait": round(pending[0], 3), "path": "/api/logos", "upload": True})
+            pending[0] = 0.0
+        preview()
+    if rng.random() < 0.2:
+        pending[0] += rng.uniform(0.5, 1.5)
+        fields["size"] = rng.choice(SIZES)
+        preview()
+    final = {"wait": round(pending[0] + rng.uniform(1.0, 4.0), 3), "path": "/", "fields": dict(fields), "logo": logo[0]}
+    if not legacy:
+        final.update(path="/api/jobs", poll=True)
+    steps.append(final)
+    return steps
+
+
+def load_sessions(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def sample_logo() -> bytes:
+    from PIL import Image, ImageDraw
+    img = Image.new("RGBA", (480, 320), (0, 0, 0, 0))
+    d = ImageDraw.Draw(img)
+    d.rounded_rectangle([10, 10, 470, 310], radius=60, fill=(79, 70, 229, 255))
+    d.ellipse([150, 70, 330, 250], fill=(255, 255, 255, 230))
+    bio = io.BytesIO()
+    img.save(bio, "PNG")
+    return bio.getvalue()
+
+
+# ---------- HTTP ----------
+
+def encode_multipart(fields: dict, logo: bytes = None):
+    boundary = "----loadtest" + uuid.uuid4().hex
+    parts = []
+    for k, v in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    if logo:
+        parts.append((f'--{boundary}\r\nContent-Disposition: form-data; name="logo"; filename="logo.png"\r\n'
+                      f'Content-Type: image/png\r\n\r\n').encode() + logo + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def new_opener():
+    # tanpa proxy dari environment (request harus langsung ke server lokal) + cookie jar per user,
+    # supaya tiap user punya sesi `cid` sendiri seperti browser
+    return urllib.request.build_opener(urllib.request.ProxyHandler({}),
+                                       urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+
+def check_local(url: str):
+    host = urllib.parse.urlsplit(url).hostname or ""
+    if host not in LOCAL_HOSTS and f"[{host}]" not in LOCAL_HOSTS:
+        raise SystemExit(f"Target {url!r} bukan localhost; loadtest hanya untuk server lokal.")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # path -> [(latency, status)]
+
+    def add(self, path, latency, status):
+        with self.lock:
+            self.samples.setdefault(path, []).append((latency, status))
+
+    def report(self, elapsed: float) -> dict:
+        out = {"elapsed_s": round(elapsed, 2), "endpoints": {}}
+        for path, rows in sorted(self.samples.items()):
+            lat = sorted(r[0] for r in rows)
+            statuses = {}
+            for _, st in rows:
+                statuses[str(st)] = statuses.get(str(st), 0) + 1
+            busy = statuses.get("429", 0)
+            errors = sum(1 for _, st in rows if not (isinstance(st, int) and 200 <= st < 400)) - busy
+            out["endpoints"][path] = {
+                "requests": len(rows),
+                "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(lat, 50) * 1000, 1),
+                "p95_ms": round(percentile(lat, 95) * 1000, 1),
+                "p99_ms": round(percentile(lat, 99) * 1000, 1),
+                "max_ms": round(lat[-1] * 1000, 1),
+                "error_rate": round(errors / len(rows), 4),
+                "busy_rate": round(busy / len(rows), 4),
+                "status": statuses,
+            }
+        return out
+
+
+def percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def send(opener, base: str, step: dict, logo: bytes, timeout: float, logo_id=""):
+    """Kirim satu langkah; return (status, body). Status berupa nama exception bila koneksi gagal."""
+    if step.get("method") == "GET":
+        req = urllib.request.Request(base + step["path"])
+    elif "json" in step:
+        spec = dict(step["json"], logo_id=logo_id) if step.get("logo") and logo_id else step["json"]
+        req = urllib.request.Request(base + step["path"], data=json.dumps(spec).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    else:
+        body, ctype = encode_multipart(step.get("fields", {}), logo if step.get("logo") or step.get("upload") else None)
+        req = urllib.request.Request(base + step["path"], data=body, method="POST", headers={"Content-Type": ctype})
+    try:
+        with opener.open(req, timeout=timeout) as r:
+            return r.status, r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except Exception as e:
+        return type(e).__name__, b""
+
+
+def _json(body: bytes) -> dict:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def poll_job(opener, base, status_url, stats, speed, deadline, timeout):
+    """Polling status job seperti UI; waktu submit->selesai dicatat sebagai "job"."""
+    t_job = time.perf_counter()
+    while time.monotonic() < deadline:
+        time.sleep(JOB_POLL / speed)
+        t0 = time.perf_counter()
+        status, body = send(opener, base, {"method": "GET", "path": status_url}, None, timeout)
+        stats.add("GET /api/jobs/<id>", time.perf_counter() - t0, status)
+        job = _json(body)
+        if job.get("status") in ("done", "failed"):
+            stats.add("job", time.perf_counter() - t_job, 200 if job["status"] == "done" else "failed")
+            return
+        if status != 200:
+            return
+
+
+def run_user(base, sessions, stats, logo, speed, deadline, timeout):
+    for steps in sessions:
+        opener = new_opener()
+        logo_id = ""
+        # buka halaman dulu seperti browser (dapat cookie sesi), baru mulai mengedit
+        for step in [{"wait": 0, "method": "GET", "path": "/"}] + steps:
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(step["wait"] / speed)
+            t0 = time.perf_counter()
+            status, body = send(opener, base, step, logo, timeout, logo_id)
+            label = ("GET " if step.get("method") == "GET" else "") + step["path"]
+            stats.add(label, time.perf_counter() - t0, status)
+            if step.get("upload"):
+                logo_id = _json(body).get("logo_id", "")
+            elif step.get("poll") and status == 202:
+                poll_job(opener, base, _json(body).get("status_url", ""), stats, speed, deadline, timeout)
+
+
+# ---------- Server lokal ----------
+
+def start_server():
+    """Jalankan app di thread (werkzeug, threaded) pada port acak localhost."""
+    from werkzeug.serving import make_server
+    from cibenCard import app
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test preview, logo & job dengan sesi editing realistis (localhost saja).")
+    ap.add_argument("--url", default="http://127.0.0.1:5013", help="base URL server lokal")
+    ap.add_argument("--start-server", action="store_true", help="jalankan cibenCard in-process di port acak")
+    ap.add_argument("--users", type=int, default=4, help="jumlah user bersamaan (concurrency)")
+    ap.add_argument("--sessions", type=int, default=5, help="sesi per user (sintetis)")
+    ap.add_argument("--duration", type=float, default=0, help="batas waktu (detik), 0 = sampai sesi habis")
+    ap.add_argument("--speed", type=float, default=1.0, help="pengali kecepatan think-time (2 = dua kali lebih cepat)")
+    ap.add_argument("--replay", help="file .jsonl sesi rekaman (satu sesi per baris)")
+    ap.add_argument("--record", help="simpan sesi sintetis yang dipakai ke file .jsonl")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--json", action="store_true", help="cetak laporan sebagai JSON")
+    args = ap.parse_args(argv)
+
+    server = None
+    if args.start_server:
+        server, base = start_server()
+    else:
+        base = args.url.rstrip("/")
+    check_local(base)
+
+    rng = random.Random(args.seed)
+    if args.replay:
+        pool = load_sessions(args.replay)
+        per_user = [[pool[(u + i * args.users) % len(pool)] for i in range(max(1, len(pool) // args.users))]
+                    for u in range(args.users)]
+    else:
+        per_user = [[synthetic_session(rng) for _ in range(args.sessions)] for _ in range(args.users)]
+        if args.record:
+            with open(args.record, "w", encoding="utf-8") as f:
+                for sessions in per_user:
+                    for steps in sessions:
+                        f.write(json.dumps(steps) + "\n")
+
+    logo = sample_logo()
+    stats = Stats()
+    deadline = time.monotonic() + args.duration if args.duration else float("inf")
+    threads = [threading.Thread(target=run_user, args=(base, sessions, stats, logo, args.speed, deadline, args.timeout))
+               for sessions in per_user]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    report = stats.report(time.monotonic() - t0)
+    report["users"] = args.users
+    if server:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(f"{args.users} user, {report['elapsed_s']} s")
+    print(f"{'endpoint':<20}{'req':>6}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}{'busy%':>7}  status")
+    for path, r in report["endpoints"].items():
+        print(f"{path:<20}{r['requests']:>6}{r['throughput_rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['error_rate'] * 100:>7.1f}{r['busy_rate'] * 100:>7.1f}  {r['status']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# replay.py
+"""
+Putar ulang capture render lambat (spool CARD_SLOW_CAPTURE_DIR) secara offline, opsional di bawah cProfile.
+
+Setiap capture berisi payload lengkap (termasuk logo) dan timing per tahap dari produksi, jadi kasus
+tail terburuk bisa direproduksi & dijadikan input benchmark.
+
+Contoh:
+    python replay.py --list
+    python replay.py --repeat 5
+    python replay.py /tmp/card_maker_slow/1718000000000-preview-ab12cd34.json --profile --top 30
+    python replay.py --cold --profile --dump-dir prof/   # cache dikosongkan tiap run; .prof untuk snakeviz
+"""
+import argparse
+import cProfile
+import glob
+import json
+import os
+import pstats
+import statistics
+import time
+
+import cibenCard
+
+
+def find_captures(paths) -> list:
+    files = []
+    for path in paths or [cibenCard.SLOW_CAPTURE_DIR]:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        else:
+            files.append(path)
+    return files
+
+
+def clear_caches():
+    """Samakan dengan proses yang baru start: semua cache render & cache disk mati (font tetap dimuat)."""
+    cibenCard.clear_render_caches()
+    cibenCard.asset_cache.enabled = False
+
+
+def replay_once(record: dict) -> dict:
+    """Jalankan ulang render sesuai jenis capture; return timing per tahap (ms) + total."""
+    payload = record["payload"]
+    if payload.get("logo") is not None:
+        payload["logo"].seek(0)
+    t0 = time.perf_counter()
+    with cibenCard.trace_stages() as timings, open(os.devnull, "wb") as sink:
+        size = cibenCard.card_size(payload)
+        with_pdf = record["kind"] != "preview"
+        if cibenCard.is_large_format(size):
+            png = cibenCard.PngStripWriter(sink, size)
+            pdf = cibenCard.PdfStripWriter(sink, size, dpi=int(payload.get("dpi", 300)),
+                                           color=cibenCard.pdf_color(payload)) if with_pdf else None
+            for strip in cibenCard.render_card_strips(payload):
+                png.write(strip)
+                if pdf:
+                    pdf.write(strip)
+            png.close()
+            if pdf:
+                pdf.close()
+        else:
+            img = cibenCard.render_card(payload)
+            cibenCard.pil_to_png_bytes(img)
+            if with_pdf:
+                cibenCard.pil_to_pdf_bytes(img, dpi=int(payload.get("dpi", 300)), color=cibenCard.pdf_color(payload))
+    result = dict(timings)
+    result["total"] = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def describe(record: dict) -> str:
+    p = record["payload"]
+    logo = f" logo={record['logo_sha256'][:12]}" if record.get("logo_sha256") else ""
+    return f"{record['kind']:<8} {p.get('size', '?'):>10} {p.get('theme', '?'):<13}{logo}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay capture render lambat cibenCard (opsional dengan cProfile).")
+    ap.add_argument("paths", nargs="*", help="file capture .json atau direktori spool (default CARD_SLOW_CAPTURE_DIR)")
+    ap.add_argument("--list", action="store_true", help="hanya tampilkan daftar capture")
+    ap.add_argument("--repeat", type=int, default=3, help="jumlah replay per capture")
+    ap.add_argument("--cold", action="store_true", help="kosongkan cache sebelum tiap replay")
+    ap.add_argument("--profile", action="store_true", help="jalankan replay di bawah cProfile")
+    ap.add_argument("--sort", default="cumulative", help="urutan statistik cProfile")
+    ap.add_argument("--top", type=int, default=20, help="jumlah baris statistik cProfile")
+    ap.add_argument("--dump-dir", help="simpan hasil cProfile per capture (.prof)")
+    ap.add_argument("--json", action="store_true", help="cetak laporan sebagai JSON")
+    args = ap.parse_args(argv)
+
+    files = find_captures(args.paths)
+    if not files:
+        ap.exit(1, "Tidak ada capture. Aktifkan dengan CARD_SLOW_CAPTURE_MS=<ambang ms>.\n")
+    if args.dump_dir:
+        os.makedirs(args.dump_dir, exist_ok=True)
+
+    report = []
+    for path in files:
+        record = cibenCard.read_capture(path)
+        entry = {"capture": os.path.basename(path), "kind": record["kind"],
+                 "captured_ms": record["total_ms"], "captured_stages_ms": record["stages_ms"]}
+        if args.list:
+            print(f"{entry['capture']:<48} {describe(record)} {record['total_ms']:>9.1f} ms")
+            continue
+        runs = []
+        profiler = cProfile.Profile() if args.profile else None
+        for _ in range(max(1, args.repeat)):
+            if args.cold:
+                clear_caches()
+            if profiler:
+                profiler.enable()
+            runs.append(replay_once(record))
+            if profiler:
+                profiler.disable()
+        totals = [r["total"] for r in runs]
+        entry["replay_ms"] = {"min": round(min(totals), 2), "median": round(statistics.median(totals), 2),
+                              "max": round(max(totals), 2)}
+        entry["replay_stages_ms"] = {k: round(v, 2) for k, v in runs[-1].items() if k != "total"}
+        report.append(entry)
+
+        if not args.json:
+            print(f"\n== {entry['capture']}  {describe(record)}")
+            print(f"   capture {record['total_ms']:.1f} ms | replay min {entry['replay_ms']['min']:.1f} / "
+                  f"median {entry['replay_ms']['median']:.1f} ms ({len(runs)}x{', cold' if args.cold else ''})")
+            for name in sorted(set(entry["captured_stages_ms"]) | set(entry["replay_stages_ms"])):
+                print(f"   {name:<12}{entry['captured_stages_ms'].get(name, 0):>10.1f}{entry['replay_stages_ms'].get(name, 0):>10.1f}")
+        if profiler:
+            if args.dump_dir:
+                profiler.dump_stats(os.path.join(args.dump_dir, os.path.splitext(entry["capture"])[0] + ".prof"))
+            if not args.json:
+                pstats.Stats(profiler).strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import cibenCard
+from cibenCard import PRIORITY_GENERATE, PRIORITY_PREVIEW, RenderScheduler, TokenBucket
+
+
+def _queue(sched, client, priority, results, timeout=2.0):
+    def run():
+        results.append((client, priority, sched.acquire(client, priority, timeout)))
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def _wait_queued(sched, n):
+    for _ in range(200):
+        if sched.snapshot()["queued"] == n:
+            return
+        time.sleep(0.005)
+    raise AssertionError(sched.snapshot())
+
+
+def test_generate_jumps_ahead_of_queued_previews():
+    sched = RenderScheduler(1)
+    assert sched.acquire("a", PRIORITY_PREVIEW, 1)
+    results = []
+    t1 = _queue(sched, "b", PRIORITY_PREVIEW, results)
+    _wait_queued(sched, 1)
+    t2 = _queue(sched, "c", PRIORITY_GENERATE, results)
+    _wait_queued(sched, 2)
+    sched.release("a")
+    t2.join(1)
+    assert results == [("c", PRIORITY_GENERATE, True)]
+    sched.release("c")
+    t1.join(1)
+    assert results[-1] == ("b", PRIORITY_PREVIEW, True)
+
+
+def test_newer_preview_supersedes_queued_one_from_same_client():
+    sched = RenderScheduler(1)
+    assert sched.acquire("x", PRIORITY_PREVIEW, 1)
+    results = []
+    old = _queue(sched, "a", PRIORITY_PREVIEW, results)
+    _wait_queued(sched, 1)
+    new = _queue(sched, "a", PRIORITY_PREVIEW, results)
+    old.join(1)
+    assert results == [("a", PRIORITY_PREVIEW, False)]
+    sched.release("x")
+    new.join(1)
+    assert results[-1] == ("a", PRIORITY_PREVIEW, True)
+
+
+def test_token_bucket_reports_wait():
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.take("k") == 0
+    assert bucket.take("k") == 0
+    assert 0 < bucket.take("k") <= 0.5
+    assert bucket.take("other") == 0
+
+
+def test_preview_returns_busy_when_bucket_empty(monkeypatch):
+    monkeypatch.setattr(cibenCard, "preview_buckets", TokenBucket(rate=0.01, burst=1))
+    client = cibenCard.app.test_client()
+    client.get("/")  # halaman editor membagikan cookie sesi
+    assert client.post("/api/preview", data={"name": "A"}).status_code == 200
+    r = client.post("/api/preview", data={"name": "A"})
+    assert r.status_code == 429
+    assert r.get_json()["busy"] is True
+    assert int(r.headers["Retry-After"]) >= 1
+
+
+def test_forged_client_cookie_does_not_get_a_fresh_bucket(monkeypatch):
+    monkeypatch.setattr(cibenCard, "preview_buckets", TokenBucket(rate=0.01, burst=1))
+    client = cibenCard.app.test_client(use_cookies=False)
+    first = client.post("/api/preview", data={"name": "A"}, headers={"Cookie": "cid=karangan1"})
+    assert first.status_code == 200
+    issued = first.headers["Set-Cookie"].split(";")[0].split("=", 1)[1]
+    assert issued.count(".") == 1 and issued != "karangan1"
+    # cookie baru tiap request tanpa tanda tangan sah: tetap bucket IP yang sama
+    forged = client.post("/api/preview", data={"name": "A"}, headers={"Cookie": "cid=karangan2"})
+    assert forged.status_code == 429
+    # cookie bertanda tangan dari server = sesi sendiri
+    signed = client.post("/api/preview", data={"name": "A"}, headers={"Cookie": f"cid={issued}"})
+    assert signed.status_code == 200 and "Set-Cookie" not in signed.headers
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+from PIL import Image, ImageChops
+
+import cibenCard
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    c = cibenCard.AssetCache(str(tmp_path / "assets"), 1024 * 1024)
+    monkeypatch.setattr(cibenCard, "asset_cache", c)
+    return c
+
+
+def test_image_round_trip_across_instances(cache):
+    img = Image.new("RGBA", (64, 32), (10, 20, 30, 200))
+    cache.put_image(("bg", "x", 64, 32), img)
+    # instance lain (mis. worker lain) membaca file yang sama
+    other = cibenCard.AssetCache(cache.root, cache.max_bytes)
+    got = other.get_image(("bg", "x", 64, 32))
+    assert got.size == (64, 32) and ImageChops.difference(got, img).getbbox() is None
+    assert other.get_image(("bg", "y", 64, 32)) is None
+
+
+def test_eviction_keeps_cache_under_budget(cache):
+    for i in range(12):
+        cache.put_bytes(("blob", i), bytes(200 * 1024))
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.max_bytes and stats["entries"] < 12
+    assert cache.get_bytes(("blob", 11)) is not None
+    assert cache.get_bytes(("blob", 0)) is None
+
+
+def test_put_does_not_sum_index_until_budget_is_crossed(cache):
+    sums = []
+    cache._db().set_trace_callback(lambda sql: sums.append(sql) if "SUM(size)" in sql else None)
+    for i in range(4):
+        cache.put_bytes(("small", i), bytes(100 * 1024))
+    assert len(sums) == 1  # hanya sinkron awal total berjalan
+    for i in range(8):
+        cache.put_bytes(("big", i), bytes(200 * 1024))
+    assert 1 < len(sums) < 12 and cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_touch_log_is_pruned(cache, monkeypatch):
+    for i in range(6):
+        cache.put_bytes(("blob", i), bytes(200 * 1024))
+        cache.get_bytes(("blob", i))
+    # yang sudah di-evict tidak tersisa di catatan touch
+    assert set(cache._touched) <= {cache.digest(("blob", i)) for i in range(6) if cache.get_bytes(("blob", i))}
+    monkeypatch.setattr(cache, "TOUCH_INTERVAL", -1)  # semua catatan kedaluwarsa
+    monkeypatch.setattr(cache, "SYNC_INTERVAL", 0)  # put berikutnya sinkron (dan merapikan catatan)
+    cache.put_bytes(("blob", "x"), b"x")
+    assert not cache._touched
+
+
+def test_concurrent_writers_same_key(cache):
+    data = bytes(range(256)) * 64
+    threads = [threading.Thread(target=cache.put_bytes, args=(("same",), data)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert bytes(cache.get_bytes(("same",))) == data
+    assert cache.stats()["entries"] == 1
+
+
+def test_background_served_from_disk_after_restart(cache, monkeypatch):
+    size = (320, 200)
+    first = Image.new("RGBA", size)
+    cibenCard.render_background(first, "pro-satin")
+    # proses baru: cache memori kosong dan plan tidak boleh dilukis ulang
+    monkeypatch.setattr(cibenCard, "_bg_cache", cibenCard.OrderedDict())
+    monkeypatch.setattr(cibenCard.RenderPlan, "paint", lambda *a, **k: pytest.fail("background dilukis ulang"))
+    second = Image.new("RGBA", size)
+    cibenCard.render_background(second, "pro-satin")
+    assert ImageChops.difference(first, second).getbbox() is None
+
+
+def test_blur_setting_is_part_of_disk_key(cache, monkeypatch):
+    cibenCard.render_background(Image.new("RGBA", (320, 200)), "pro-aurora")
+    # restart dengan CARD_BLUR_MIN_RADIUS lain: background di disk tidak boleh dipakai
+    monkeypatch.setattr(cibenCard, "_bg_cache", cibenCard.OrderedDict())
+    monkeypatch.setattr(cibenCard, "BLUR_MIN_RADIUS", 2)
+    painted = []
+    real_paint = cibenCard.RenderPlan.paint
+    monkeypatch.setattr(cibenCard.RenderPlan, "paint", lambda *a, **k: painted.append(1) or real_paint(*a, **k))
+    cibenCard.render_background(Image.new("RGBA", (320, 200)), "pro-aurora")
+    assert painted
+
+
+def test_failed_removal_is_not_subtracted_from_total(cache, monkeypatch):
+    for i in range(4):
+        cache.put_bytes(("blob", i), bytes(200 * 1024))
+    stuck = cache._path(cache.digest(("blob", 0)))  # korban LRU pertama
+    real_remove = cibenCard.os.remove
+
+    def remove(path):
+        if path == stuck:
+            raise PermissionError(path)
+        real_remove(path)
+
+    monkeypatch.setattr(cibenCard.os, "remove", remove)
+    for i in range(4, 8):
+        cache.put_bytes(("blob", i), bytes(200 * 1024))
+    assert cache.get_bytes(("blob", 0)) is not None
+    assert cache._total == cache.stats()["bytes"] <= cache.max_bytes
@@ -0,0 +1,103 @@
+import dataclasses
+import io
+
+import pytest
+from PIL import Image, ImageChops
+from werkzeug.datastructures import MultiDict
+
+import cibenCard
+from cibenCard import CardSpec
+
+
+def _logo_bytes():
+    bio = io.BytesIO()
+    Image.new("RGBA", (90, 60), (30, 160, 90, 255)).save(bio, "PNG")
+    return bio.getvalue()
+
+
+def test_spec_is_frozen_slotted_and_canonical():
+    a = CardSpec.from_dict({"name": "Andi", "accent": "#4F46E5", "size": "1050x600"})
+    b = CardSpec.from_dict({"size": [1050, 600], "accent": [79, 70, 229], "name": "Andi"})
+    assert a == b and a.key == b.key and hash(a) == hash(b)
+    assert not hasattr(a, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        a.name = "Budi"
+    assert CardSpec.from_dict({"name": "Budi"}).key != a.key
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"nama": "x"}, "tidak dikenal"),
+    ({"theme": "pro-nope"}, "Tema"),
+    ({"accent": "ungu"}, "accent"),
+    ({"size": "besar"}, "size"),
+    ({"size": "20000x20000"}, "terlalu besar"),
+    ({"logo_id": "../etc/passwd"}, "logo_id"),
+    ({"name": "x" * 400}, "maksimal"),
+])
+def test_invalid_spec_is_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        CardSpec.from_dict(data)
+
+
+def test_form_conversion_stays_lenient():
+    spec = CardSpec.from_form(MultiDict({"name": "Andi", "theme": "lama", "accent": "zzz", "size": "abc"}))
+    assert (spec.theme, spec.accent, spec.size) == ("pro-modern", (59, 130, 246), (1050, 600))
+
+
+def test_form_routes_accept_long_text_and_clamp_dpi():
+    spec = CardSpec.from_form(MultiDict({"address": "Jl. " + "x" * 400, "dpi": "9999"}))
+    assert len(spec.address) == 404 and spec.dpi == 2400
+    with pytest.raises(ValueError, match="maksimal"):
+        CardSpec.from_dict({"address": "Jl. " + "x" * 400})
+
+    client = cibenCard.app.test_client()
+    resp = client.post("/", data={"action": "generate", "name": "Andi", "address": "Jl. Panjang " * 40,
+                                  "size": "400x250", "dpi": "300"})
+    assert resp.status_code == 200
+    assert b'download="business_card.png"' in resp.data
+    preview = client.post("/api/preview", data={"name": "Andi", "address": "Jl. Panjang " * 40})
+    assert preview.status_code == 200 and "X-Card-Quality" in preview.headers  # bukan PNG error
+
+
+def test_json_preview_with_logo_id_matches_multipart_preview():
+    client = cibenCard.app.test_client()
+    logo_id = client.post("/api/logos", data={"logo": (io.BytesIO(_logo_bytes()), "l.png")}).get_json()["logo_id"]
+    fields = {"name": "Andi", "url": "https://example.com", "theme": "pro-glass", "size": "700x400"}
+
+    resp = client.post("/api/card/preview", json=dict(fields, logo_id=logo_id))
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+    multipart = client.post("/api/preview", data=dict(fields, logo=(io.BytesIO(_logo_bytes()), "l.png")),
+                            content_type="multipart/form-data")
+    a, b = Image.open(io.BytesIO(resp.data)), Image.open(io.BytesIO(multipart.data))
+    assert ImageChops.difference(a, b).getbbox() is None
+
+    again = client.post("/api/card/preview", json=dict(fields, logo_id=logo_id), headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_revalidation_skips_rate_limit_and_parses_etags(monkeypatch):
+    client = cibenCard.app.test_client()
+    spec = {"name": "Revalidasi", "size": "400x250"}
+    etag = client.post("/api/card/preview", json=spec).headers["ETag"]
+    monkeypatch.setattr(cibenCard, "preview_buckets", cibenCard.TokenBucket(rate=0.01, burst=0))
+    for header in (etag, "W/" + etag, f'"lain", {etag}', "*"):
+        assert client.post("/api/card/preview", json=spec, headers={"If-None-Match": header}).status_code == 304
+    # bukan tag utuh (substring) -> tidak cocok, jadi kena admission seperti request biasa
+    partial = '"x' + etag.strip('"') + '"'
+    assert client.post("/api/card/preview", json=spec, headers={"If-None-Match": partial}).status_code == 429
+
+
+def test_unknown_logo_and_bad_upload_are_reported():
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/card/preview", json={"logo_id": "0" * 32})
+    assert resp.status_code == 400 and "upload ulang" in resp.get_json()["error"]
+    assert client.post("/api/logos", data=b"bukan gambar").status_code == 400
+
+
+def test_job_accepts_logo_id():
+    client = cibenCard.app.test_client()
+    logo_id = client.post("/api/logos", data=_logo_bytes()).get_json()["logo_id"]
+    with cibenCard.app.test_request_context("/api/jobs", json={"cards": [{"name": "A", "logo_id": logo_id}]}):
+        cards, dpi = cibenCard._job_cards_from_request()
+    assert dpi == 300 and cards[0]["logo"] and cards[0]["name"] == "A"
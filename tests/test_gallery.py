@@ -0,0 +1,48 @@
+import email
+import io
+
+import pytest
+from PIL import Image, ImageChops
+
+import cibenCard
+
+PAYLOAD = {"name": "Andi Wijaya", "title": "Software Engineer", "email": "andi@contoh.id",
+           "url": "https://example.com", "size": "700x400"}
+
+
+def _logo():
+    bio = io.BytesIO()
+    Image.new("RGBA", (90, 60), (200, 30, 30, 255)).save(bio, "PNG")
+    return bio.getvalue()
+
+
+@pytest.mark.parametrize("first", ["pro-clean", "pro-glass"])
+def test_gallery_tiles_match_individual_renders(first):
+    # layout dibagi antar tema (termasuk geser glass/non-glass) tanpa mengubah hasil
+    themes = [first, "pro-aurora", "pro-dark", "pro-lines"]
+    accents = ["#4f46e5", "#10b981"]
+    tiles = cibenCard.render_gallery(dict(PAYLOAD, logo=io.BytesIO(_logo())), themes + [first], accents, 350)
+    for theme, accent, img in tiles:
+        single = cibenCard.render_card(dict(PAYLOAD, theme=theme, accent=accent, size="350x200", logo=io.BytesIO(_logo())))
+        assert ImageChops.difference(single, img).getbbox() is None, (theme, accent)
+
+
+def test_gallery_endpoint_sheet_and_multipart():
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/gallery", data=dict(PAYLOAD, themes="pro-dark,pro-satin", accents="all", thumb="128"))
+    assert resp.status_code == 200 and resp.mimetype == "image/png"
+    assert Image.open(io.BytesIO(resp.data)).width > 128 * len(cibenCard.PALETTES)
+
+    resp = client.post("/api/gallery", data=dict(PAYLOAD, themes=["pro-dark", "pro-glass"], format="multipart", thumb="200"))
+    assert resp.mimetype == "multipart/mixed"
+    msg = email.message_from_bytes(b"Content-Type: " + resp.content_type.encode() + b"\r\n\r\n" + resp.data)
+    parts = msg.get_payload()
+    assert [p["X-Theme"] for p in parts] == ["pro-dark", "pro-glass"]
+    assert Image.open(io.BytesIO(parts[0].get_payload(decode=True))).size == (200, 114)
+
+
+def test_gallery_rejects_unknown_theme_and_too_many_tiles(monkeypatch):
+    client = cibenCard.app.test_client()
+    assert client.post("/api/gallery", data={"themes": "pro-nope"}).status_code == 400
+    monkeypatch.setattr(cibenCard, "GALLERY_MAX_TILES", 5)
+    assert client.post("/api/gallery", data={"accents": "all"}).status_code == 400
@@ -0,0 +1,152 @@
+"""
+Golden-image regression suite: matriks payload x semua tema x ukuran dibandingkan dengan PNG referensi
+di tests/golden/. Pixel yang beda lebih dari GOLDEN_TOLERANCE per kanal dihitung berubah; kasus gagal
+bila porsi pixel berubah melebihi GOLDEN_MAX_CHANGED. Gambar diff (merah = berubah) ditulis ke
+GOLDEN_DIFF_DIR, bersama golden-report.json berisi waktu render tiap kasus vs baseline.
+
+    GOLDEN_UPDATE=1 python -m pytest tests/test_golden.py        # tulis ulang referensi + baseline waktu
+    GOLDEN_MAX_SLOWDOWN=1.5 python -m pytest tests/test_golden.py # gagal juga bila render > 1.5x baseline
+
+Referensi hanya valid untuk font & FreeType yang sama (lihat manifest.json); bila beda, suite di-skip.
+"""
+import io
+import json
+import os
+import time
+
+import pytest
+from PIL import Image, ImageChops, features
+
+import cibenCard
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+MANIFEST = os.path.join(GOLDEN_DIR, "manifest.json")
+DIFF_DIR = os.environ.get("GOLDEN_DIFF_DIR", os.path.join(GOLDEN_DIR, "diff"))
+UPDATE = os.environ.get("GOLDEN_UPDATE") == "1"
+TOLERANCE = int(os.environ.get("GOLDEN_TOLERANCE", "3"))
+MAX_CHANGED = float(os.environ.get("GOLDEN_MAX_CHANGED", "0.0005"))
+MAX_SLOWDOWN = float(os.environ.get("GOLDEN_MAX_SLOWDOWN", "0"))  # 0 = waktu hanya dilaporkan
+
+# ukuran harus >= minimum parse_size (400x250) supaya yang dirender = yang tertulis di nama file
+SIZES = ["400x250", "400x640", "1050x600"]
+# glow aurora di-blur pada resolusi turun (_blur_scale) baru mulai sisi pendek >= 1600 px
+LARGE_CASES = [("full", "pro-aurora", "2800x1600"), ("minimal", "pro-glass", "2800x1600")]
+
+
+def _logo():
+    img = Image.new("RGBA", (120, 80), (0, 0, 0, 0))
+    img.paste((220, 38, 38, 255), (0, 0, 60, 80))
+    img.paste((37, 99, 235, 255), (60, 20, 120, 80))
+    bio = io.BytesIO()
+    img.save(bio, "PNG")
+    return bio.getvalue()
+
+
+PAYLOADS = {
+    "full": {
+        "name": "Andi Wijaya", "title": "Software Engineer", "company": "PT Contoh Maju",
+        "email": "andi@contoh.id", "phone": "+62 812 3456 7890", "address": "Jl. Merdeka No. 1, Jakarta",
+        "url": "https://example.com/andi", "accent": "#4f46e5", "logo": _logo(),
+    },
+    "minimal": {"name": "Siti", "accent": "#f97316"},
+    "long": {
+        "name": "Raden Mas Bagus Hadiningrat Kusumawardhana", "title": "Senior Principal Staff Engineer, Platform",
+        "company": "Perusahaan Teknologi Nusantara Sejahtera Abadi", "email": "raden.mas.bagus@perusahaan-panjang.co.id",
+        "address": "Jl. Jenderal Sudirman Kav. 52-53, Senayan, Kebayoran Baru, Jakarta Selatan 12190",
+        "url": "https://perusahaan-panjang.co.id/tim/raden-mas-bagus", "accent": "#10b981",
+    },
+}
+
+CASES = [(p, t, s) for p in PAYLOADS for t in cibenCard.THEMES for s in SIZES] + LARGE_CASES
+
+
+def _case_id(case):
+    return "{}-{}-{}".format(*case)
+
+
+def environment() -> dict:
+    fonts = [" ".join(cibenCard.load_font(16, w).getname()) for w in ("regular", "semibold", "bold")]
+    return {"fonts": fonts, "freetype": features.version("freetype2")}
+
+
+def _load_manifest():
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as f:
+            return json.load(f)
+    return {"environment": None, "timings_ms": {}}
+
+
+@pytest.fixture(scope="module")
+def golden():
+    manifest = _load_manifest()
+    env = environment()
+    if not UPDATE and manifest["environment"] != env:
+        pytest.skip(f"Referensi golden dibuat dengan {manifest['environment']}, lingkungan ini {env}")
+    if os.path.isdir(DIFF_DIR):
+        for name in os.listdir(DIFF_DIR):  # diff dari run sebelumnya
+            if name.endswith(".png"):
+                os.remove(os.path.join(DIFF_DIR, name))
+    results = {}
+    yield manifest, results
+    if UPDATE:
+        manifest = {"environment": env,
+                    "timings_ms": dict(manifest["timings_ms"], **{k: r["ms"] for k, r in results.items()})}
+        with open(MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+    os.makedirs(DIFF_DIR, exist_ok=True)
+    with open(os.path.join(DIFF_DIR, "golden-report.json"), "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+
+@pytest.fixture
+def fresh_render(monkeypatch):
+    # render dari nol: cache render (memori & disk) tidak boleh menutupi perubahan kode render
+    monkeypatch.setattr(cibenCard.asset_cache, "enabled", False)
+    cibenCard.clear_render_caches()
+
+
+def _diff_image(ref: Image.Image, mask: Image.Image) -> Image.Image:
+    base = ref.convert("L").convert("RGB")
+    red = Image.new("RGB", ref.size, (255, 0, 0))
+    return Image.composite(red, base, mask)
+
+
+@pytest.mark.parametrize("case", CASES, ids=_case_id)
+def test_golden(case, golden, fresh_render):
+    manifest, results = golden
+    name = _case_id(case)
+    payload_key, theme, size = case
+    payload = dict(PAYLOADS[payload_key], theme=theme, size=size)
+    if payload.get("logo"):
+        payload["logo"] = io.BytesIO(payload["logo"])
+
+    t0 = time.perf_counter()
+    out = cibenCard.render_card(payload)
+    ms = (time.perf_counter() - t0) * 1000
+    baseline = manifest["timings_ms"].get(name)
+    results[name] = {"ms": round(ms, 2), "baseline_ms": baseline,
+                     "ratio": round(ms / baseline, 2) if baseline else None}
+
+    ref_path = os.path.join(GOLDEN_DIR, name + ".png")
+    if UPDATE:
+        out.save(ref_path, optimize=True)
+        return
+    assert os.path.exists(ref_path), f"Referensi {ref_path} belum ada; jalankan dengan GOLDEN_UPDATE=1"
+    ref = Image.open(ref_path).convert("RGBA")
+    assert ref.size == out.size
+
+    diff = ImageChops.difference(ref, out)
+    # pixel berubah = kanal mana pun (termasuk alpha) beda > TOLERANCE
+    mask = Image.new("L", out.size, 0)
+    for band in diff.split():
+        mask = ImageChops.lighter(mask, band.point(lambda v: 255 if v > TOLERANCE else 0))
+    changed = mask.histogram()[255] / (out.width * out.height)
+    results[name]["changed"] = round(changed, 6)
+    if changed > MAX_CHANGED:
+        os.makedirs(DIFF_DIR, exist_ok=True)
+        diff_path = os.path.join(DIFF_DIR, name + "-diff.png")
+        _diff_image(ref, mask).save(diff_path)
+        out.save(os.path.join(DIFF_DIR, name + "-actual.png"))
+        pytest.fail(f"{name}: {changed:.3%} pixel berubah (batas {MAX_CHANGED:.3%}); lihat {diff_path}")
+    if MAX_SLOWDOWN and baseline and ms > baseline * MAX_SLOWDOWN:
+        pytest.fail(f"{name}: render {ms:.1f} ms, {ms / baseline:.2f}x baseline {baseline:.1f} ms")
@@ -0,0 +1,118 @@
+import io
+import json
+
+import pytest
+from PIL import Image
+
+import cibenCard
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    q = cibenCard.JobQueue(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(cibenCard, "job_queue", q)
+    monkeypatch.setattr(cibenCard, "start_job_workers", lambda: None)  # job diproses manual di test
+    return q
+
+
+def _logo():
+    bio = io.BytesIO()
+    Image.new("RGBA", (60, 40), (200, 30, 30, 255)).save(bio, "PNG")
+    bio.seek(0)
+    return bio
+
+
+def test_form_job_renders_to_result_store(queue):
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/jobs", data={"name": "Andi", "theme": "pro-dark", "size": "400x250", "dpi": "150",
+                                          "logo": (_logo(), "logo.png")}, content_type="multipart/form-data")
+    assert resp.status_code == 202
+    job_id = resp.get_json()["id"]
+    assert client.get(f"/api/jobs/{job_id}").get_json()["status"] == "queued"
+
+    assert cibenCard.run_next_job()
+    job = client.get(f"/api/jobs/{job_id}").get_json()
+    assert job["status"] == "done" and job["progress"] == 1
+    png = client.get(job["cards"][0]["png_url"])
+    assert Image.open(io.BytesIO(png.data)).size == (400, 250)
+    assert not cibenCard.run_next_job()
+
+
+def test_json_batch_reports_events(queue):
+    client = cibenCard.app.test_client()
+    cards = [{"name": "A", "size": "300x180"}, {"name": "B", "size": "300x180", "theme": "pro-lines"}]
+    job_id = client.post("/api/jobs", json={"cards": cards}).get_json()["id"]
+    cibenCard.run_next_job()
+    events = client.get(f"/api/jobs/{job_id}/events").get_data(as_text=True)
+    last = json.loads(events.strip().split("\n\n")[-1][len("data: "):])
+    assert last["status"] == "done" and len(last["cards"]) == 2
+
+
+def test_invalid_job_is_rejected(queue):
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/jobs", json={"cards": [{"size": "20000x20000"}]})
+    assert resp.status_code == 400 and "terlalu besar" in resp.get_json()["error"]
+
+
+@pytest.mark.parametrize("body, message", [
+    ([{"name": "x"}], "objek"),
+    ({"cards": [{"name": "x", "logo": "!!!"}]}, "logo"),
+    ({"cards": [{"name": "x", "logo": "aGFsbw=="}]}, "logo"),  # base64 valid, tapi bukan gambar
+])
+def test_malformed_json_job_is_rejected_at_submit(queue, body, message):
+    resp = cibenCard.app.test_client().post("/api/jobs", json=body)
+    assert resp.status_code == 400 and message in resp.get_json()["error"]
+    assert queue.claim() is None
+
+
+def test_stale_running_job_is_requeued(queue, monkeypatch):
+    job_id = queue.submit([{"name": "A", "size": "300x180"}], 300)
+    assert queue.claim()["id"] == job_id  # worker "mati" setelah claim
+    monkeypatch.setattr(cibenCard, "JOB_STALE_SECONDS", -1)
+    # proses lain (mis. setelah restart) mengambil ulang job yang macet
+    restarted = cibenCard.JobQueue(queue.path)
+    assert cibenCard.run_next_job(restarted)
+    assert restarted.get(job_id)["status"] == "done"
+
+
+def test_worker_whose_claim_was_taken_cannot_write(queue, monkeypatch):
+    job_id = queue.submit([{"name": "A", "size": "300x180"}], 300)
+    old = queue.claim()
+    monkeypatch.setattr(cibenCard, "JOB_STALE_SECONDS", -1)
+    new = queue.claim()  # _recover mengantrekan ulang, worker kedua mengambil alih
+    assert new["id"] == job_id and new["attempt"] == old["attempt"] + 1
+    assert not queue.update(job_id, old["attempt"], 0.5, "basi")
+    assert not queue.fail(job_id, old["attempt"], "worker lama")
+    assert not queue.finish(job_id, old["attempt"], [{"png_url": "/result/lama.png"}])
+    assert queue.get(job_id)["status"] == "running" and queue.get(job_id)["error"] is None
+    assert queue.finish(job_id, new["attempt"], [{"png_url": "/result/baru.png"}])
+    assert queue.get(job_id)["cards"] == [{"png_url": "/result/baru.png"}]
+
+
+def test_job_waiting_for_render_slot_keeps_heartbeat(queue, monkeypatch):
+    job_id = queue.submit([{"name": "A", "size": "300x180"}], 300)
+    real_slot, busy = cibenCard.render_slot, [2]
+
+    def flaky_slot(client, priority):
+        if busy[0]:
+            busy[0] -= 1
+            raise cibenCard.RenderBusy(retry_after=0)
+        return real_slot(client, priority)
+
+    beats = []
+    real_update = queue.update
+    monkeypatch.setattr(cibenCard, "render_slot", flaky_slot)
+    monkeypatch.setattr(queue, "update", lambda jid, attempt, p, stage: beats.append(stage) or real_update(jid, attempt, p, stage))
+    assert cibenCard.run_next_job()
+    assert beats.count("menunggu slot render") == 3  # sekali per percobaan ambil slot
+    assert queue.get(job_id)["status"] == "done"
+
+
+def test_event_stream_is_capped_and_sends_keepalives(queue, monkeypatch):
+    monkeypatch.setattr(cibenCard, "JOB_EVENTS_MAX_SECONDS", 0.3)
+    monkeypatch.setattr(cibenCard, "JOB_EVENTS_KEEPALIVE", 0.1)
+    monkeypatch.setattr(cibenCard, "JOB_POLL_INTERVAL", 0.05)
+    job_id = queue.submit([{"name": "A", "size": "300x180"}], 300)  # tidak pernah diproses
+    events = cibenCard.app.test_client().get(f"/api/jobs/{job_id}/events").get_data(as_text=True)
+    assert events.startswith("retry: ") and ": keep-alive" in events
+    assert json.loads(events.split("data: ", 1)[1].split("\n\n")[0])["status"] == "queued"
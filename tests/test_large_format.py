@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops
+
+import cibenCard
+
+
+PAYLOAD = {
+    "name": "Andi Wijaya",
+    "title": "Software Engineer",
+    "company": "PT Contoh",
+    "email": "andi@contoh.id",
+    "url": "https://example.com",
+    "theme": "pro-aurora",
+    "accent": "#4f46e5",
+    "size": "1050x600",
+}
+
+
+def _stitch(strips, size):
+    out = Image.new("RGBA", size)
+    y = 0
+    for strip in strips:
+        out.paste(strip, (0, y))
+        y += strip.height
+    return out
+
+
+@pytest.mark.parametrize("theme", ["pro-aurora", "pro-glass", "pro-carbon", "pro-lines"])
+def test_strips_match_full_render(theme):
+    payload = dict(PAYLOAD, theme=theme)
+    full = cibenCard.render_card(payload)
+    stitched = _stitch(cibenCard.render_card_strips(payload, budget_mb=0.5), full.size)
+    assert ImageChops.difference(full, stitched).getbbox() is None
+
+
+def test_png_strip_writer_roundtrip():
+    payload = dict(PAYLOAD)
+    full = cibenCard.render_card(payload)
+    bio = io.BytesIO()
+    writer = cibenCard.PngStripWriter(bio, full.size)
+    for strip in cibenCard.render_card_strips(payload, budget_mb=0.5):
+        writer.write(strip)
+    writer.close()
+    decoded = Image.open(io.BytesIO(bio.getvalue()))
+    assert decoded.size == full.size
+    assert ImageChops.difference(full, decoded.convert("RGBA")).getbbox() is None
+
+
+def test_pdf_strip_writer_structure():
+    bio = io.BytesIO()
+    writer = cibenCard.PdfStripWriter(bio, (400, 250), dpi=300)
+    writer.write(Image.new("RGB", (400, 250), (10, 20, 30)))
+    writer.close()
+    data = bio.getvalue()
+    assert data.startswith(b"%PDF-1.4")
+    assert data.rstrip().endswith(b"%%EOF")
+    xref = int(data.rsplit(b"startxref\n", 1)[1].split(b"\n", 1)[0])
+    assert data[xref:xref + 4] == b"xref"
+
+
+def test_pixel_cap_is_enforced(monkeypatch):
+    monkeypatch.setattr(cibenCard, "MAX_CARD_PIXELS", 1_000_000)
+    with pytest.raises(ValueError, match="terlalu besar"):
+        cibenCard.card_size({"size": "2000x1000"})
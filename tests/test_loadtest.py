@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+import loadtest
+
+
+def test_synthetic_session_mimics_debounced_editing(monkeypatch):
+    monkeypatch.setattr(loadtest, "LEGACY_SESSIONS", 0)
+    steps = loadtest.synthetic_session(random.Random(7))
+    assert steps[0]["path"] == "/api/card/preview" and set(steps[0]["json"]) == set(loadtest.SPEC_FIELDS)
+    assert steps[-1]["path"] == "/api/jobs" and steps[-1]["poll"]
+    assert steps[-1]["fields"]["action"] == "generate"
+    # setiap preview menunggu minimal satu jeda debounce
+    assert all(s["wait"] >= loadtest.DEBOUNCE for s in steps if s["path"] == "/api/card/preview")
+
+
+def test_legacy_session_uses_form_routes(monkeypatch):
+    monkeypatch.setattr(loadtest, "LEGACY_SESSIONS", 1)
+    steps = loadtest.synthetic_session(random.Random(7))
+    assert {s["path"] for s in steps} == {"/api/preview", "/"}
+
+
+def test_load_run_covers_json_logo_and_job_flows(monkeypatch):
+    monkeypatch.setattr(loadtest, "LEGACY_SESSIONS", 0)
+    # seed 3: sesi dengan upload logo
+    report = loadtest.main(["--start-server", "--users", "1", "--sessions", "1", "--seed", "3", "--speed", "50", "--json"])
+    endpoints = report["endpoints"]
+    for path in ("/api/card/preview", "/api/logos", "/api/jobs", "GET /api/jobs/<id>", "job"):
+        assert path in endpoints and endpoints[path]["error_rate"] == 0, path
+
+
+def test_percentile_interpolates():
+    vals = [0.1, 0.2, 0.3, 0.4]
+    assert loadtest.percentile(vals, 50) == pytest.approx(0.25)
+    assert loadtest.percentile(vals, 100) == pytest.approx(0.4)
+
+
+def test_rejects_non_local_target():
+    with pytest.raises(SystemExit):
+        loadtest.check_local("http://example.com:5013")
+    loadtest.check_local("http://127.0.0.1:5013")
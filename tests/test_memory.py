@@ -0,0 +1,54 @@
+import tracemalloc
+
+import pytest
+from PIL import Image
+
+import cibenCard
+from cibenCard import MemoryMonitor
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    was_tracing = tracemalloc.is_tracing()
+    mon = MemoryMonitor(True, frames=1, interval=0)
+    monkeypatch.setattr(cibenCard, "memory_monitor", mon)
+    yield mon
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_stage_records_python_peak_and_images(monitor):
+    with cibenCard.stage("outer"):
+        with cibenCard.stage("inner"):
+            blob = bytearray(2 * 1024 * 1024)
+            del blob
+        Image.new("RGBA", (64, 64))
+    stages = monitor.report()["stages"]
+    # puncak stage dalam tetap terlihat oleh stage luar walau peak tracemalloc di-reset di tengah
+    assert stages["inner"]["py_peak_kb_max"] >= 2048
+    assert stages["outer"]["py_peak_kb_max"] >= 2048
+    assert stages["outer"]["images_max"] == 1 and stages["inner"]["images_max"] == 0
+
+
+def test_snapshot_diff_points_at_growing_site(monitor):
+    leak = []
+    monitor.take_snapshot()
+    leak.extend(bytes(4096) + bytes([i % 256]) for i in range(200))
+    growth = monitor.take_snapshot()
+    assert growth and growth[0]["site"].rsplit(":", 1)[0] == __file__
+    assert growth[0]["size_diff_kb"] >= 700
+
+
+def test_recycle_threshold(monkeypatch):
+    mon = MemoryMonitor(False, recycle_mb=1)
+    assert mon.should_recycle() and mon.report()["recycle_pending"]
+    assert not MemoryMonitor(False, recycle_mb=0).should_recycle()
+
+
+def test_debug_endpoint(monitor, monkeypatch):
+    client = cibenCard.app.test_client()
+    client.post("/api/card", json={"name": "Andi"})
+    report = client.get("/debug/memory").get_json()
+    assert report["enabled"] and report["endpoints"]["api_card_spec"]["count"] == 1
+    monkeypatch.setattr(cibenCard, "memory_monitor", MemoryMonitor(False))
+    assert client.get("/debug/memory").status_code == 404
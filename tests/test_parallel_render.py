@@ -0,0 +1,35 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops
+
+import cibenCard
+
+
+def _logo_bytes():
+    bio = io.BytesIO()
+    Image.new("RGBA", (120, 80), (200, 30, 30, 255)).save(bio, "PNG")
+    return bio.getvalue()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(cibenCard, "RENDER_THREADS", 3)
+    return cibenCard.render_pool()
+
+
+@pytest.mark.parametrize("theme", ["pro-aurora", "pro-glass", "pro-carbon", "pro-dark"])
+def test_parallel_render_matches_sequential(pool, theme):
+    payload = {"name": "Andi", "title": "Eng", "url": "https://example.com", "theme": theme, "size": "1400x800"}
+    seq = cibenCard.render_card(dict(payload, parallel=False, logo=io.BytesIO(_logo_bytes())))
+    par = cibenCard.render_card(dict(payload, parallel=True, logo=io.BytesIO(_logo_bytes())))
+    assert ImageChops.difference(seq, par).getbbox() is None
+
+
+def test_filter_bands_matches_full_filter(pool):
+    from PIL import ImageDraw, ImageFilter
+    img = Image.new("RGBA", (300, 400), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse([40, 60, 260, 340], fill=(20, 180, 160, 200))
+    filt = ImageFilter.GaussianBlur(8)
+    banded = cibenCard._filter_bands(img, filt, 24, pool)
+    assert ImageChops.difference(img.filter(filt), banded).getbbox() is None
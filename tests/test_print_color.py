@@ -0,0 +1,47 @@
+import io
+import re
+import zlib
+
+import pytest
+from PIL import Image
+
+import cibenCard
+
+
+def _image_stream(pdf: bytes) -> bytes:
+    head, rest = pdf.split(b"4 0 obj\n", 1)
+    length = int(re.search(rb"6 0 obj\n(\d+)", pdf).group(1))
+    body = rest.split(b"stream\n", 1)[1][:length]
+    return zlib.decompress(body)
+
+
+def test_cmyk_pdf_without_profile_uses_device_cmyk(monkeypatch):
+    monkeypatch.setattr(cibenCard, "CMYK_PROFILE", "")
+    img = Image.new("RGBA", (40, 20), (255, 0, 0, 255))
+    pdf = cibenCard.pil_to_pdf_bytes(img, dpi=300, color="cmyk")
+    assert b"/ColorSpace /DeviceCMYK" in pdf
+    data = _image_stream(pdf)
+    assert len(data) == 40 * 20 * 4
+    assert data[:4] == bytes(Image.new("RGB", (1, 1), (255, 0, 0)).convert("CMYK").tobytes())
+
+
+def test_cmyk_pdf_embeds_output_profile(monkeypatch):
+    monkeypatch.setattr(cibenCard, "print_transform", lambda: (None, b"icc-profile-bytes"))
+    bio = io.BytesIO()
+    writer = cibenCard.PdfStripWriter(bio, (30, 10), dpi=300, color="cmyk")
+    writer.write(Image.new("RGB", (30, 10), (0, 128, 255)))
+    writer.close()
+    pdf = bio.getvalue()
+    assert b"/ColorSpace [/ICCBased 7 0 R]" in pdf and b"/N 4 /Alternate /DeviceCMYK" in pdf
+    assert b"trailer\n<< /Size 8 " in pdf
+    assert len(_image_stream(pdf)) == 30 * 10 * 4
+
+
+def test_export_rejects_unknown_color():
+    with pytest.raises(ValueError, match="rgb atau cmyk"):
+        cibenCard.export_card({"size": "300x180", "color": "pantone"})
+
+
+def test_unknown_intent_is_rejected():
+    with pytest.raises(ValueError, match="intent"):
+        cibenCard.color_transform("", "/tidak/ada.icc", "vivid")
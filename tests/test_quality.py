@@ -0,0 +1,85 @@
+import io
+
+import pytest
+from PIL import Image
+
+import cibenCard
+from cibenCard import QualityGovernor, RenderScheduler
+
+
+class _Sched:
+    def __init__(self, queued=0, slots=2):
+        self.queued, self.slots = queued, slots
+
+    def snapshot(self):
+        return {"slots": self.slots, "active": self.slots, "queued": self.queued}
+
+
+def test_queue_depth_degrades_and_recovers_with_hysteresis():
+    sched = _Sched()
+    gov = QualityGovernor(sched, latency_ms=1000, queue_depth=1)
+    assert gov.choose() == "full"
+    sched.queued = 2
+    assert gov.choose() == "reduced"
+    sched.queued = 5
+    assert gov.choose() == "minimal"
+    sched.queued = 3  # tekanan 1.5: masih di atas ambang turun level 2 (2 * 0.7)
+    assert gov.choose() == "minimal"
+    sched.queued = 2
+    assert gov.choose() == "reduced"
+    sched.queued = 0
+    assert gov.choose() == "full"
+
+
+def test_latency_ewma_degrades_and_decays(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cibenCard.time, "monotonic", lambda: now[0])
+    gov = QualityGovernor(RenderScheduler(2), latency_ms=500, queue_depth=1)
+    for _ in range(20):
+        gov.observe(1500)
+    assert gov.choose() == "minimal"
+    now[0] += cibenCard.QUALITY_DECAY_SECONDS * 4  # lama tanpa preview
+    assert gov.choose() == "full"
+
+
+def test_governor_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(cibenCard, "QUALITY_GOVERNOR", False)
+    assert QualityGovernor(_Sched(queued=50), latency_ms=1, queue_depth=1).choose() == "full"
+
+
+@pytest.mark.parametrize("level, size, expected", [
+    ("full", "1050x600", "1050x600"),
+    ("reduced", "1050x600", "630x360"),
+    ("minimal", "1050x600", "438x250"),  # tidak di bawah ukuran minimum kartu, rasio tetap
+])
+def test_degrade_preview_scales_payload(monkeypatch, level, size, expected):
+    monkeypatch.setattr(cibenCard.quality_governor, "choose", lambda: level)
+    payload = {"size": size}
+    assert cibenCard.degrade_preview(payload) == level
+    assert payload == {"size": expected, "quality": level}
+
+
+def test_degraded_preview_is_marked_and_not_cached(monkeypatch):
+    monkeypatch.setattr(cibenCard.quality_governor, "choose", lambda: "reduced")
+    client = cibenCard.app.test_client()
+    spec = {"name": "Sibuk", "theme": "pro-aurora", "size": "1050x600", "url": "https://example.com"}
+    resp = client.post("/api/card/preview", json=spec)
+    assert resp.status_code == 200 and resp.headers["X-Card-Quality"] == "reduced"
+    assert "ETag" not in resp.headers and resp.headers["Cache-Control"] == "no-store"
+    assert Image.open(io.BytesIO(resp.data)).size == (630, 360)
+    assert cibenCard.CardSpec.from_dict(spec).key not in cibenCard._preview_cache
+
+    monkeypatch.setattr(cibenCard.quality_governor, "choose", lambda: "full")
+    resp = client.post("/api/card/preview", json=spec)
+    assert resp.headers["X-Card-Quality"] == "full" and resp.headers["ETag"]
+    assert Image.open(io.BytesIO(resp.data)).size == (1050, 600)
+
+
+def test_draft_background_is_cached_separately():
+    size = (420, 260)
+    full, draft = Image.new("RGBA", size), Image.new("RGBA", size)
+    cibenCard.render_background(full, "pro-glass")
+    cibenCard.render_background(draft, "pro-glass", draft=True)
+    assert ("pro-glass", 420, 260) in cibenCard._bg_cache
+    assert ("pro-glass", 420, 260, "draft") in cibenCard._bg_cache
+    assert full.tobytes() != draft.tobytes()
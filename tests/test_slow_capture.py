@@ -0,0 +1,68 @@
+import io
+import os
+
+from PIL import Image
+
+import cibenCard
+import replay
+
+
+def _logo_bytes():
+    bio = io.BytesIO()
+    Image.new("RGBA", (60, 40), (20, 120, 200, 255)).save(bio, "PNG")
+    return bio.getvalue()
+
+
+def _enable(monkeypatch, tmp_path, threshold=0.0, mb=64):
+    monkeypatch.setattr(cibenCard, "SLOW_CAPTURE_MS", threshold)
+    monkeypatch.setattr(cibenCard, "SLOW_CAPTURE_SAMPLE", 1.0)
+    monkeypatch.setattr(cibenCard, "SLOW_CAPTURE_DIR", str(tmp_path))
+    monkeypatch.setattr(cibenCard, "SLOW_CAPTURE_MB", mb)
+
+
+def test_slow_preview_is_captured_and_replayable(monkeypatch, tmp_path):
+    _enable(monkeypatch, tmp_path, threshold=0.001)
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/preview", data={"name": "Andi", "theme": "pro-aurora", "size": "400x250",
+                                             "logo": (io.BytesIO(_logo_bytes()), "logo.png")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 200 and resp.mimetype == "image/png"
+
+    files = replay.find_captures([str(tmp_path)])
+    assert len(files) == 1
+    record = cibenCard.read_capture(files[0])
+    assert record["kind"] == "preview" and record["payload"]["theme"] == "pro-aurora"
+    assert record["payload"]["logo"].getvalue() == _logo_bytes()
+    assert {"layout", "background", "compose", "encode_png"} <= set(record["stages_ms"])
+
+    report = replay.main([str(tmp_path), "--repeat", "1", "--json"])
+    assert report[0]["replay_ms"]["min"] > 0
+
+
+def test_fast_renders_are_not_captured(monkeypatch, tmp_path):
+    _enable(monkeypatch, tmp_path, threshold=60_000)
+    with cibenCard.capture_render("preview", {"size": "300x180", "logo": None}):
+        pass
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_is_size_capped(monkeypatch, tmp_path):
+    _enable(monkeypatch, tmp_path, mb=0)
+    for _ in range(3):
+        with cibenCard.capture_render("job", {"size": "300x180", "logo": io.BytesIO(_logo_bytes())}):
+            pass
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".json")]) == 0
+
+
+def test_cold_replay_clears_every_render_memo(monkeypatch):
+    monkeypatch.setattr(cibenCard.asset_cache, "enabled", False)  # background benar-benar dilukis
+    monkeypatch.setattr(cibenCard, "BLUR_MIN_RADIUS", 2)  # glow resolusi turun juga di ukuran kecil
+    cibenCard.clear_render_caches()
+    for theme in ("pro-aurora", "pro-carbon", "pro-lines"):
+        cibenCard.render_card({"name": "Andi", "url": "https://example.com", "theme": theme, "size": "400x250"})
+    warm = [fn for fn in cibenCard._render_memos if fn.cache_info().currsize]
+    assert {fn.__name__ for fn in warm} >= {"qr_matrix", "make_qr", "glow", "_checker_tile", "_lines_tile"}
+
+    replay.clear_caches()
+    assert not cibenCard._bg_cache
+    assert all(fn.cache_info().currsize == 0 for fn in cibenCard._render_memos)
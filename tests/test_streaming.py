@@ -0,0 +1,112 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from PIL import Image, ImageChops
+
+import cibenCard
+
+
+SPEC = {"name": "Andi Wijaya", "theme": "pro-glass", "size": "1050x600", "url": "https://example.com"}
+
+
+def _large(monkeypatch):
+    monkeypatch.setattr(cibenCard, "LARGE_FORMAT_PIXELS", 100_000)
+    monkeypatch.setattr(cibenCard, "RENDER_MEMORY_MB", 1)  # banyak strip kecil
+    monkeypatch.setattr(cibenCard.quality_governor, "choose", lambda: "full")
+
+
+def test_large_preview_is_streamed_per_strip(monkeypatch):
+    _large(monkeypatch)
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/card/preview", json=SPEC)
+    assert resp.is_streamed and resp.headers["ETag"]
+    chunks = list(resp.response)
+    assert len(chunks) > 2
+    streamed = Image.open(io.BytesIO(b"".join(chunks)))
+    expected = cibenCard.render_card(cibenCard.CardSpec.from_dict(SPEC).to_payload())
+    assert ImageChops.difference(streamed.convert("RGBA"), expected).getbbox() is None
+    resp.close()
+    assert cibenCard.render_scheduler.snapshot()["active"] == 0
+
+
+def test_unconsumed_stream_releases_render_slot(monkeypatch):
+    _large(monkeypatch)
+    client = cibenCard.app.test_client()
+    resp = client.post("/api/preview", data=dict(SPEC), buffered=False)
+    assert cibenCard.render_scheduler.snapshot()["active"] == 1
+    resp.close()
+    assert cibenCard.render_scheduler.snapshot()["active"] == 0
+
+
+def test_export_writes_results_without_byte_copies(monkeypatch):
+    def no_bytes(*a, **k):
+        raise AssertionError("export tidak boleh lewat bytes")
+    monkeypatch.setattr(cibenCard, "pil_to_png_bytes", no_bytes)
+    monkeypatch.setattr(cibenCard, "pil_to_pdf_bytes", no_bytes)
+    png_url, pdf_url = cibenCard.export_card(cibenCard.CardSpec.from_dict(SPEC).to_payload())
+    png_path = os.path.join(cibenCard.RESULT_DIR, os.path.basename(png_url))
+    assert Image.open(png_path).size == (1050, 600)
+    with open(os.path.join(cibenCard.RESULT_DIR, os.path.basename(pdf_url)), "rb") as f:
+        assert f.read(5) == b"%PDF-"
+
+
+def test_failed_export_leaves_no_partial_files(monkeypatch):
+    def broken(img, fp, **kwargs):
+        fp.write(b"%PDF-")
+        raise RuntimeError("encoder gagal")
+    monkeypatch.setattr(cibenCard, "write_pdf", broken)
+    before = set(os.listdir(cibenCard.RESULT_DIR))
+    try:
+        cibenCard.export_card(cibenCard.CardSpec.from_dict(SPEC).to_payload())
+    except RuntimeError:
+        pass
+    assert set(os.listdir(cibenCard.RESULT_DIR)) == before
+
+
+def test_failed_pdf_waits_for_parallel_png_writer(monkeypatch):
+    monkeypatch.setattr(cibenCard, "RENDER_THREADS", 4)
+    png_started, png_done = threading.Event(), []
+    real_png = cibenCard.write_png
+
+    def slow_png(img, fp, *args):
+        png_started.set()
+        time.sleep(0.2)
+        real_png(img, fp, *args)  # ValueError bila file sudah ditutup result_files
+        png_done.append(fp.closed)
+
+    def broken_pdf(img, fp, **kwargs):
+        png_started.wait(1)
+        raise RuntimeError("encoder gagal")
+
+    monkeypatch.setattr(cibenCard, "write_png", slow_png)
+    monkeypatch.setattr(cibenCard, "write_pdf", broken_pdf)
+    before = set(os.listdir(cibenCard.RESULT_DIR))
+    with pytest.raises(RuntimeError):
+        cibenCard.export_card(dict(cibenCard.CardSpec.from_dict(SPEC).to_payload(), parallel=True))
+    assert png_done == [False]  # writer selesai sebelum file ditutup & dihapus
+    assert set(os.listdir(cibenCard.RESULT_DIR)) == before
+
+
+def test_result_download_supports_conditional_get_and_range():
+    png_url, _ = cibenCard.export_card(cibenCard.CardSpec.from_dict(SPEC).to_payload())
+    client = cibenCard.app.test_client()
+    full = client.get(png_url)
+    assert full.status_code == 200 and full.headers["ETag"] and "immutable" in full.headers["Cache-Control"]
+    assert "public" not in full.headers["Cache-Control"]
+    assert client.get(png_url, headers={"If-None-Match": full.headers["ETag"]}).status_code == 304
+    part = client.get(png_url, headers={"Range": "bytes=0-7"})
+    assert part.status_code == 206 and part.data == b"\x89PNG\r\n\x1a\n"
+    assert client.get("/result/tidak-ada.png").status_code == 404
+    assert client.get("/result/..").status_code == 404
+
+
+def test_result_download_via_accel_redirect(monkeypatch):
+    png_url, _ = cibenCard.export_card(cibenCard.CardSpec.from_dict(SPEC).to_payload())
+    monkeypatch.setattr(cibenCard, "RESULT_ACCEL_REDIRECT", "/_results/")
+    resp = cibenCard.app.test_client().get(png_url)
+    assert resp.headers["X-Accel-Redirect"] == "/_results/" + os.path.basename(png_url)
+    assert resp.data == b"" and resp.mimetype == "image/png"
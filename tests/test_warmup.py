@@ -0,0 +1,24 @@
+from PIL import Image, ImageChops
+
+import cibenCard
+
+
+def test_readyz_turns_healthy_after_warm_up(monkeypatch):
+    monkeypatch.setattr(cibenCard, "_ready", cibenCard.threading.Event())
+    monkeypatch.setattr(cibenCard, "_warmup_thread", None)
+    monkeypatch.setattr(cibenCard, "warm_up", lambda sizes=None: None)  # jangan render di thread latar
+    client = cibenCard.app.test_client()
+    assert client.get("/readyz").status_code == 503
+    cibenCard._ready.set()
+    assert client.get("/readyz").get_json() == {"ready": True}
+
+
+def test_cached_background_matches_fresh_paint():
+    size = (400, 250)
+    cibenCard.warm_up(sizes=["400x250"])
+    cached = Image.new("RGBA", size)
+    cibenCard.render_background(cached, "pro-aurora")
+    fresh = Image.new("RGBA", size)
+    cibenCard.theme_plan("pro-aurora").paint(fresh)
+    assert ("pro-aurora", 400, 250) in cibenCard._bg_cache
+    assert ImageChops.difference(cached, fresh).getbbox() is None